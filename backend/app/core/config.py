@@ -11,6 +11,7 @@ for the application using Pydantic's BaseSettings.
 
 import os
 import base64
+from typing import Dict
 from pydantic import BaseSettings, validator
 
 class Settings(BaseSettings):
@@ -25,7 +26,131 @@ class Settings(BaseSettings):
     POST_RETRIES: int = 3
     TESSERACT_CMD: str | None = None
 
+    # --- OCR ---
+    OCR_POLICY: str = "local_first"        # "local", "remote" or "local_first"
+    OCR_MIN_CONFIDENCE: float = 0.7        # local_first falls back to remote below this (0.0 - 1.0)
+    TESSERACT_LANG: str = "eng"
+    PDF_TEXT_MIN_CHARS: int = 80           # Text-layer chars needed to skip rasterization + OCR
+    PDF_MAX_PAGES: int = 3                 # Leading PDF pages read, rasterized and scanned
+
+    # --- Rasterization Profile (PDF -> image) ---
+    RASTER_DPI: int = 150                  # Target render resolution
+    RASTER_GRAYSCALE: bool = True          # OCR and QR decoding do not need colour
+    RASTER_MAX_PIXELS: int = 8_000_000     # DPI is lowered for large pages to stay under this
+    RASTER_THREAD_COUNT: int = 1           # pdftoppm threads per conversion (the CPU pool already runs in parallel)
+
+    # --- QR Detection ---
+    QR_SCAN_MAX_SIDE: int = 1200           # First pass runs on a grayscale copy this size
+    QR_OPENCV_FALLBACK: bool = True        # Try OpenCV's QRCodeDetector when pyzbar finds no URL
+
+    # --- Image Decoding ---
+    IMAGE_MAX_PIXELS: int = 60_000_000     # Larger images are refused before decoding
+    CERTIFICATE_IMAGE_MAX_SIDE: int = 2400 # Photos of certificates are decoded down to this
+    FACE_IMAGE_MAX_SIDE: int = 1024        # Profile photos are decoded down to this for face analysis
+
+    # --- OCR Upload Encoding ---
+    OCR_UPLOAD_FORMAT: str = "png"         # "png", "jpeg" or "webp"
+    OCR_UPLOAD_QUALITY: int = 85           # For jpeg / webp
+
+    # --- CPU Pool ---
+    CPU_POOL_WORKERS: int = 0  # 0 = one worker process per CPU core
+
+    # --- Shared HTTP Clients (one pool per upstream) ---
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP2_ENABLED: bool = True  # Used only when the optional `h2` package is installed
+
+    # --- Job Store ---
+    JOB_DB_PATH: str = "./data/jobs.db"
+    JOB_DB_BUSY_TIMEOUT_MS: int = 5000
+    # Opt-in: when > 0, the blob GC deletes finished job records older than this, and with
+    # them the encrypted uploads the downstream server was given the path of. 0 keeps them forever.
+    JOB_RETENTION_DAYS: int = 0
+    JOB_LEASE_SECONDS: float = 300.0  # A worker process's claim on a running job; renewed while it runs
+
+    # --- Encrypted Blob Store ---
+    BLOB_GC_INTERVAL_SECONDS: int = 3600
+    BLOB_GC_GRACE_SECONDS: int = 3600  # Unreferenced blobs are kept at least this long
+    BLOB_GC_DELETE_TIMEOUT_SECONDS: int = 300  # A GC tombstone older than this is treated as abandoned
+
+    # --- Upload Ingestion ---
+    SPOOL_DIR: str = "./data/spool"              # Uploads are streamed here instead of held in memory
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024     # Larger uploads are rejected with 413
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+
+    # --- Verification Result Cache (deduplicates identical re-uploads) ---
+    CACHE_DB_PATH: str = "./data/cache.db"
+    RESULT_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    RESULT_CACHE_MAX_ENTRIES: int = 50_000
+
+    # --- OCR Result Cache (memory LRU + on-disk tier) ---
+    OCR_CACHE_MEMORY_MAX_BYTES: int = 16 * 1024 * 1024
+    OCR_CACHE_DISK_MAX_BYTES: int = 256 * 1024 * 1024
+    OCR_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+
+    # --- AI Verification (LLM) Cache ---
+    LLM_CACHE_MEMORY_MAX_BYTES: int = 8 * 1024 * 1024
+    LLM_CACHE_DISK_MAX_BYTES: int = 128 * 1024 * 1024
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # --- Issuer Registry ---
+    ISSUER_REGISTRY_PATH: str | None = None  # JSON registry; defaults to the bundled app/data/issuers.json
+
+    # --- Verification Tiers ---
+    RULES_TIER_ENABLED: bool = True        # Settle clear-cut certificates without the LLM
+
+    # --- AI Verification (LLM) Generation ---
+    LLM_STREAMING: bool = True             # Stream single requests and stop once the JSON verdict closes
+    LLM_MAX_NEW_TOKENS: int = 300
+    LLM_COMPACT_PROMPT: bool = False       # Short prompt with a compact output schema
+    LLM_TEXT_TOKEN_BUDGET: int = 600       # Approx. tokens of certificate text in the compact prompt
+
+    # --- Hugging Face Micro-batching ---
+    HF_BATCH_WINDOW_MS: int = 25           # How long a call waits for others to join its batch
+    HF_BATCH_MAX_SIZE: int = 8             # A batch is sent as soon as it has this many items
+    HF_OCR_BATCH_INPUTS: bool = False      # Send OCR batches as one JSON list (dedicated endpoints only)
+    HF_LLM_BATCH_INPUTS: bool = False      # Send verification batches as one JSON list (dedicated endpoints only)
+
+    # --- Hugging Face Resilience ---
+    HF_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures (timeouts, 5xx) that open a circuit
+    HF_BREAKER_RESET_SECONDS: float = 30.0 # How long an open circuit fails fast before a probe call
+    HF_TIMEOUT_MIN_SECONDS: float = 5.0    # Adaptive timeout = p99 latency x multiplier, within these bounds
+    HF_TIMEOUT_MAX_SECONDS: float = 45.0   # Also the timeout until enough latencies are recorded
+    HF_TIMEOUT_MULTIPLIER: float = 2.0
+    HF_HEDGE_ENABLED: bool = False         # Send a second request when the first is slower than usual
+    HF_HEDGE_PERCENTILE: int = 95          # "Slower than usual" = this latency percentile
+    HF_MAX_DEFER_SECONDS: float = 120.0    # Longest a job waits for a loading model before retrying
+    HF_MAX_DEFERRALS: int = 5              # A job fails after this many deferrals
+
+    # --- Model Warm-up ---
+    WARMUP_ENABLED: bool = True                    # Ping the models in use from lifespan; /health returns 503 until they first answer
+    WARMUP_TIMEOUT_SECONDS: float = 300.0          # Give up waiting on a cold model after this (keep-warm keeps trying)
+    KEEP_WARM_ENABLED: bool = True
+    KEEP_WARM_INTERVAL_SECONDS: float = 240.0      # Ping a model that has had no traffic for this long
+    KEEP_WARM_IDLE_SECONDS: float = 3600.0         # After this long without traffic, back off the pings...
+    KEEP_WARM_MAX_INTERVAL_SECONDS: float = 1800.0 # ...doubling the interval up to this
+
+    # --- Verification Page Cache (HTTP-aware) ---
+    PAGE_CACHE_DEFAULT_TTL_SECONDS: int = 3600          # Used when the response has no max-age
+    PAGE_CACHE_HOST_TTLS: Dict[str, int] = {            # Per-host overrides; subdomains match too
+        "coursera.org": 24 * 3600,
+        "credly.com": 24 * 3600,
+        "udemy.com": 24 * 3600,
+    }
+    PAGE_CACHE_RETENTION_SECONDS: int = 7 * 24 * 3600   # How long stale pages are kept for revalidation
+    PAGE_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    PAGE_FETCH_PER_HOST_LIMIT: int = 4                  # Concurrent fetches per issuer host, across all jobs
+
+    # --- Job Scheduler ---
+    WORKER_CONCURRENCY: int = 4          # Jobs processed in parallel
+    MAX_QUEUE_DEPTH: int = 100           # Jobs allowed to wait for a worker before /verify returns 429
+    QUEUE_RETRY_AFTER_SECONDS: int = 10  # Retry-After hint sent with 429 responses
+    MAX_BATCH_FILES: int = 50            # Files accepted by one /verify/batch request
+
     AES_KEY: bytes | None = None  # Will be derived from AES_KEY_BASE64
+    AES_KEY_ID: str = ""  # Recorded in encrypted blob headers; defaults to a fingerprint of the key
+    ENCRYPTION_CHUNK_BYTES: int = 64 * 1024  # Plaintext bytes per authenticated chunk
 
     @validator("AES_KEY_BASE64")
     def validate_aes_key(cls, v: str) -> str:
@@ -178,19 +178,24 @@ Updated: 2025-09-14
 This is the main entry point for the FastAPI application. It defines the API
 endpoints for certificate verification and face analysis.
 """
+import json
 import uuid
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import base64
 
-from fastapi import FastAPI, File, UploadFile, Form, BackgroundTasks, Request, HTTPException, Header
+from fastapi import FastAPI, File, UploadFile, Form, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.models.schemas import VerifyRequest
-from app.services import jobs, face_analysis
+from app.services import jobs, face_analysis, job_store, cpu_pool, http_client, uploads, blob_store, issuers, resilience, warmup
+from app.services import huggingface as hf_service
 from app.utils import security
+from app.utils.admission import QueueAdmissionMiddleware
+from app.utils.body_limit import BodySizeLimitMiddleware
 
 # --- Lifespan event handler to initialize resources on startup ---
 @asynccontextmanager
@@ -203,7 +208,31 @@ async def lifespan(app: FastAPI):
         security.initialize_aes_key(key_bytes)
     except Exception as e:
         print(f"❌ FATAL: Could not initialize AES key from .env: {e}")
+
+    # Compile the issuer registry once, then pre-fork the CPU pool before any job can be scheduled onto it
+    issuers.load_registry()
+    cpu_pool.start()
+    http_client.start()
+    # Load cold Hugging Face models in the background; /health reports readiness
+    warmup.start()
+
+    # Open the durable job store and resume anything a previous process left unfinished
+    job_store.init_store()
+    jobs.scheduler.start()
+    recovered = jobs.recover_pending_jobs()
+    if recovered:
+        print(f"♻️ Re-enqueueing {len(recovered)} unfinished job(s) from the job store.")
+    jobs.scheduler.enqueue_in_background(recovered)
+    jobs.start_lease_sweeper()
+    blob_store.start_gc()
     yield
+    await blob_store.stop_gc()
+    await warmup.stop()
+    await jobs.stop_lease_sweeper()
+    await jobs.scheduler.stop()
+    cpu_pool.shutdown()
+    await http_client.close()
+    job_store.close_store()
     print("👋 Application shutdown.")
 
 
@@ -215,6 +244,28 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Allowance for multipart boundaries and form fields on top of the file bytes.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Enforced on the raw body stream, before FastAPI parses the multipart form.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/verify": settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/verify/batch": (settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES) * settings.MAX_BATCH_FILES,
+        "/analyze-face": settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    },
+)
+
+# Refuses new jobs before their uploads are received while the queue is full.
+app.add_middleware(
+    QueueAdmissionMiddleware,
+    paths=["/verify", "/verify/batch"],
+    has_capacity=lambda: jobs.scheduler.has_capacity(),
+    retry_after_seconds=settings.QUEUE_RETRY_AFTER_SECONDS,
+)
+
+# Added last so it is outermost: the early 413 and 429 answers above carry CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, restrict this to specific domains
@@ -224,10 +275,51 @@ app.add_middleware(
 )
 
 
+def _ensure_queue_capacity(count: int = 1) -> None:
+    """Rejects the request with 429 if the scheduler cannot take `count` more jobs."""
+    if not jobs.scheduler.has_capacity(count):
+        raise HTTPException(
+            status_code=429,
+            detail="Verification queue is full. Please retry later.",
+            headers={"Retry-After": str(settings.QUEUE_RETRY_AFTER_SECONDS)},
+        )
+
+
+async def _ingest_upload(
+    file: UploadFile, metadata: str, userid: str, batch_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Streams one upload to its spool file and builds the job record for it.
+
+    Raises:
+        HTTPException: 413 if the upload exceeds `MAX_UPLOAD_BYTES`.
+    """
+    job_id = uuid.uuid4().hex
+    job_data: Dict[str, Any] = {
+        "jobId": job_id,
+        "userid": userid,
+        "createdAt": datetime.utcnow().isoformat(),
+        "status": "queued",
+        "source": "upload",
+        "filename": file.filename,
+        "content_type": file.content_type,
+        "metadata": metadata  # Pass the received metadata string directly to the job.
+    }
+    if batch_id:
+        job_data["batchId"] = batch_id
+    try:
+        # Hash at ingest: the digest keys the result cache for duplicate uploads.
+        spool_path, blob_hash, size = await uploads.spool_upload(file, job_id)
+    except uploads.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"{file.filename}: {e}")
+    job_data.update({"spool_path": spool_path, "blob_hash_sha256": blob_hash, "size_bytes": size})
+    return job_data
+
+
 # --- API Endpoints ---
 @app.post("/verify", status_code=202, response_model=Dict[str, str])
 async def create_verification_job(
-    background_tasks: BackgroundTasks,
+    request: Request,
     file: UploadFile = File(...),
     metadata: str = Form(...), # <<< METADATA FIX: Now correctly expecting a 'metadata' form field.
     x_user: Optional[str] = Header(None, alias="X-User")
@@ -235,31 +327,91 @@ async def create_verification_job(
     """
     Accepts a certificate for verification via multipart/form-data and queues it for background processing.
     The Node.js server sends the file and a 'metadata' field containing a JSON string.
+
+    Returns 429 with a `Retry-After` header when the job queue is full, and 413 when
+    the upload exceeds `MAX_UPLOAD_BYTES`. The body size is enforced by
+    `BodySizeLimitMiddleware` while it is received, before the form is parsed. The
+    file is then streamed to a spool file on disk and hashed incrementally.
     """
-    job_id = uuid.uuid4().hex
-    
+    _ensure_queue_capacity()
+
     # The 'userid' here is the student's name from the header, used for name validation.
     # The actual studentId ObjectId is inside the metadata string.
     userid = x_user.strip() if x_user else "default_user"
+    job_data = await _ingest_upload(file, metadata, userid)
+    job_id = job_data["jobId"]
 
-    job_data: Dict[str, Any] = {
-        "jobId": job_id,
-        "userid": userid,
-        "createdAt": datetime.utcnow().isoformat(),
-        "status": "queued",
-        "source": "upload",
-        "filename": file.filename,
-        "content_type": file.content_type,
-        "raw_bytes": await file.read(),
-        "metadata": metadata  # Pass the received metadata string directly to the job.
-    }
-
-    jobs.JOBS[job_id] = job_data
-    background_tasks.add_task(jobs.process_and_forward, job_id)
+    # Re-check after reading the upload; no await between here and submit, so admission is atomic.
+    if not jobs.scheduler.has_capacity():
+        uploads.discard(job_data["spool_path"])
+        _ensure_queue_capacity()
+    jobs.create_job(job_data)
+    jobs.scheduler.submit(job_id)
 
     return {"jobId": job_id, "status": "queued"}
 
 
+@app.post("/verify/batch", status_code=202, response_model=Dict[str, Any])
+async def create_verification_batch(
+    files: List[UploadFile] = File(...),
+    metadata: str = Form(...),
+    x_user: Optional[str] = Header(None, alias="X-User")
+):
+    """
+    Accepts many certificates in one multipart request and queues them together as a batch.
+
+    The 'metadata' field is a JSON array with one object (or JSON string) per file, in the
+    same order as `files`. A single JSON object is applied to every file. Returns the
+    `batchId` and every `jobId` at once; poll `/verify/batch/{batch_id}` for progress.
+    """
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {settings.MAX_BATCH_FILES} files.")
+    try:
+        per_file_metadata = json.loads(metadata)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="'metadata' must be a JSON array with one entry per file.")
+    if isinstance(per_file_metadata, dict):
+        per_file_metadata = [per_file_metadata] * len(files)
+    if not isinstance(per_file_metadata, list) or len(per_file_metadata) != len(files):
+        raise HTTPException(status_code=400, detail="'metadata' must be a JSON array with one entry per file.")
+
+    _ensure_queue_capacity(len(files))
+    batch_id = uuid.uuid4().hex
+    userid = x_user.strip() if x_user else "default_user"
+
+    job_datas: List[Dict[str, Any]] = []
+    try:
+        for file, file_metadata in zip(files, per_file_metadata):
+            metadata_str = file_metadata if isinstance(file_metadata, str) else json.dumps(file_metadata)
+            job_datas.append(await _ingest_upload(file, metadata_str, userid, batch_id))
+    except HTTPException:
+        for job_data in job_datas:
+            uploads.discard(job_data["spool_path"])
+        raise
+
+    # Admit the whole batch or none of it; no await between the check and the submits.
+    if not jobs.scheduler.has_capacity(len(job_datas)):
+        for job_data in job_datas:
+            uploads.discard(job_data["spool_path"])
+        _ensure_queue_capacity(len(job_datas))
+    jobs.create_jobs(job_datas)
+    for job_data in job_datas:
+        jobs.scheduler.submit(job_data["jobId"])
+
+    return {"batchId": batch_id, "jobIds": [job_data["jobId"] for job_data in job_datas], "status": "queued"}
+
+
+@app.get("/verify/batch/{batch_id}", response_model=Dict[str, Any])
+async def get_batch_status(batch_id: str):
+    """
+    Retrieves aggregate progress and per-job status for a batch.
+    """
+    batch = jobs.get_batch_status(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
 @app.get("/verify/{job_id}", response_model=Dict[str, Any])
 async def get_verification_status(job_id: str):
     """
@@ -278,7 +430,7 @@ async def analyze_face_endpoint(file: UploadFile = File(...)):
     """
     try:
         file_bytes = await file.read()
-        analysis_result = face_analysis.analyze_face_image(file_bytes)
+        analysis_result = await cpu_pool.run(face_analysis.analyze_face_image, file_bytes)
         
         if "error" in analysis_result:
             raise HTTPException(status_code=400, detail=analysis_result["error"])
@@ -295,11 +447,33 @@ async def analyze_face_endpoint(file: UploadFile = File(...)):
             "analysis": analysis_result,
             "recommendations": face_analysis.get_face_recommendations(analysis_result)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {str(e)}")
 
 
-@app.get("/health", response_model=Dict[str, str])
+@app.get("/health", response_model=Dict[str, Any])
 async def health_check():
-    """A simple health check endpoint."""
-    return {"status": "ok", "downstream_endpoint": settings.SERVER_ENDPOINT}
+    """
+    A simple health check endpoint, including model readiness, job queue
+    utilisation, cache hit rates and upstream circuit state. Until the initial
+    warm-up of the Hugging Face models in use has finished, `status` is
+    "warming_up" and the response is a 503, so load balancers hold traffic back.
+    After that it is always a 200; a model that has gone cold again only makes
+    `status` "degraded".
+    """
+    ready = warmup.is_warmed_up()
+    body = {
+        "status": "warming_up" if not ready else "ok" if warmup.is_ready() else "degraded",
+        "ready": ready,
+        "models": warmup.stats(),
+        "downstream_endpoint": settings.SERVER_ENDPOINT,
+        "queue": jobs.scheduler.stats(),
+        "caches": {
+            "ocr": hf_service.ocr_cache_stats(),
+            "ai_verification": hf_service.verification_cache_stats(),
+        },
+        "circuit_breakers": resilience.breaker_stats(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
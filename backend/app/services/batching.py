@@ -0,0 +1,113 @@
+# File: app/services/batching.py
+
+"""
+Request Micro-Batching
+
+Author: Mandar K.
+Date: 2025-09-26
+
+This module coalesces individual calls made by concurrent jobs into small
+batches. Items are collected for a short window (or until the batch is full),
+handed to a batch handler in one call, and each waiting coroutine receives its
+own result. It is used to send fewer, larger requests to the Hugging Face
+Inference API so concurrent jobs share round trips and rate-limit quota. When
+the upstream cannot take a batch in one request, batching is switched off and
+calls are dispatched at once instead of waiting out the window for nothing.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+BatchHandler = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """
+    Collects items submitted within `window_seconds` (up to `max_batch_size`)
+    and processes them with a single call to `handler`.
+
+    The handler receives the list of items and must return a list of results
+    in the same order. A result that is an exception is raised to that item's
+    caller only (e.g. from `asyncio.gather(..., return_exceptions=True)`). If
+    the handler itself raises, every caller in that batch receives the exception.
+    """
+
+    def __init__(self, name: str, handler: BatchHandler, max_batch_size: int, window_seconds: float,
+                 enabled: Callable[[], bool] = lambda: True):
+        """
+        Args:
+            name: Used in log lines and stats.
+            handler: Coroutine function that processes a list of items.
+            max_batch_size: A batch is dispatched as soon as it reaches this size.
+            window_seconds: How long the first item in a batch waits for others.
+            enabled: Whether to batch at all; when it returns False, each item is dispatched at once.
+        """
+        self.name = name
+        self.handler = handler
+        self.enabled = enabled
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_seconds = max(0.0, window_seconds)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.counters = {"batches": 0, "items": 0, "largest_batch": 0}
+
+    async def submit(self, item: Any) -> Any:
+        """Adds an item to the current batch and waits for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size or self.max_batch_size == 1 or not self.enabled():
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        # Shield so one cancelled caller does not cancel the batch for the others.
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch), name=f"batch-{self.name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.counters["batches"] += 1
+        self.counters["items"] += len(batch)
+        self.counters["largest_batch"] = max(self.counters["largest_batch"], len(batch))
+        items = [item for item, _ in batch]
+        try:
+            results = await self.handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name} batch handler returned {len(results)} results for {len(items)} items")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark retrieved so callers that went away are not logged as unhandled
+                    future.exception()
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, asyncio.CancelledError):
+                future.cancel()
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+                future.exception()  # Retrieved, in case the caller went away
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "avg_batch_size": round(self.counters["items"] / batches, 2) if batches else 0.0,
+        }
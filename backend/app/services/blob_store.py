@@ -0,0 +1,212 @@
+# File: app/services/blob_store.py
+
+"""
+Encrypted Blob Store
+
+Author: Mandar K.
+Date: 2025-09-25
+
+This module stores encrypted certificate uploads by content hash. Identical
+uploads share a single blob; jobs hold references to the blobs they produced,
+and a background garbage collector deletes blobs that no job references any
+more. Storage goes through a small `BlobBackend` interface so the local,
+fan-out directory layout can later be swapped for an S3-compatible store.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.services import certificate_processing as cert_proc
+from app.services import job_store
+from app.utils.cache import SingleFlight
+
+
+class BlobBackend(ABC):
+    """Where encrypted blobs live. Implementations must make `put_file` atomic."""
+
+    @abstractmethod
+    async def put_file(self, key: str, src_path: str) -> None:
+        """Stores the file at `src_path` under `key`. The source file is consumed."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Returns True if a blob is stored under `key`."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Deletes the blob under `key`; missing blobs are ignored."""
+
+    @abstractmethod
+    def locator(self, key: str) -> str:
+        """A path or URI identifying the blob, reported to the downstream server."""
+
+
+class LocalBlobBackend(BlobBackend):
+    """
+    Stores blobs on the local filesystem with two levels of fan-out
+    (`ab/cd/abcd....enc`) so no single directory grows too large.
+    All filesystem calls run in a worker thread.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def locator(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], f"{key}.enc")
+
+    def _put(self, key: str, src_path: str) -> None:
+        final_path = self.locator(key)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        try:
+            os.replace(src_path, final_path)
+        except OSError:
+            # Source is on another filesystem: copy next to the target, then rename atomically.
+            tmp_path = f"{final_path}.{os.getpid()}.tmp"
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, final_path)
+            os.remove(src_path)
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self.locator(key))
+        except FileNotFoundError:
+            pass
+
+    async def put_file(self, key: str, src_path: str) -> None:
+        await asyncio.to_thread(self._put, key, src_path)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.locator(key))
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+class InMemoryBlobBackend(BlobBackend):
+    """A process-local stand-in backend for tests and scripts."""
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+
+    def locator(self, key: str) -> str:
+        return f"memory://{key}"
+
+    async def put_file(self, key: str, src_path: str) -> None:
+        with open(src_path, "rb") as f:
+            self.blobs[key] = f.read()
+        os.remove(src_path)
+
+    async def exists(self, key: str) -> bool:
+        return key in self.blobs
+
+    async def delete(self, key: str) -> None:
+        self.blobs.pop(key, None)
+
+
+_backend: BlobBackend = LocalBlobBackend(settings.UPLOAD_DIR)
+_store_flight = SingleFlight()
+_TOMBSTONE_POLL_SECONDS = 0.25
+_gc_task: Optional[asyncio.Task] = None
+
+
+def configure(backend: BlobBackend) -> None:
+    """Replaces the storage backend (e.g. with an S3-compatible implementation)."""
+    global _backend
+    _backend = backend
+
+
+async def store_upload(job_id: str, blob_hash: str, src_path: str) -> str:
+    """
+    Encrypts and stores a spooled upload under its content hash, unless an
+    identical upload is already stored, and records the job's reference to it.
+
+    Args:
+        job_id: The job that owns the upload.
+        blob_hash: SHA-256 of the plaintext upload; used as the blob key.
+        src_path: The spooled plaintext upload (left in place).
+
+    Returns:
+        The blob's locator (path or URI).
+    """
+    # Reference first: a blob is never collectable while a job is still writing it.
+    while not job_store.add_blob_ref(blob_hash, job_id):
+        # The GC is deleting an earlier copy; once it is gone, upload afresh.
+        await asyncio.sleep(_TOMBSTONE_POLL_SECONDS)
+    await _store_flight.do(blob_hash, lambda: _write_blob(blob_hash, src_path))
+    return _backend.locator(blob_hash)
+
+
+async def _write_blob(key: str, src_path: str) -> None:
+    if await _backend.exists(key):
+        return
+    tmp_dir = os.path.join(settings.UPLOAD_DIR, ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".enc")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(cert_proc.encrypt_upload_to, src_path, tmp_path)
+        await _backend.put_file(key, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def collect_garbage() -> int:
+    """
+    Purges finished job records past `JOB_RETENTION_DAYS` (0 keeps them
+    forever), then deletes blobs that no remaining job references.
+
+    Returns:
+        The number of blobs deleted.
+    """
+    purged = 0
+    if settings.JOB_RETENTION_DAYS > 0:
+        cutoff = (datetime.utcnow() - timedelta(days=settings.JOB_RETENTION_DAYS)).isoformat()
+        purged = job_store.purge_finished_jobs(cutoff)
+    deleted = 0
+    for key in job_store.find_unreferenced_blobs(time.time() - settings.BLOB_GC_GRACE_SECONDS):
+        # The tombstone re-checks the references; the (possibly slow) delete then runs without any lock.
+        tombstone = job_store.tombstone_blob(key)
+        if tombstone is None:
+            continue
+        try:
+            await _backend.delete(key)
+        except Exception as e:
+            print(f"⚠️ Blob GC could not delete {key}: {e}")
+            job_store.restore_blob(key, tombstone)
+            continue
+        job_store.forget_blob(key, tombstone)
+        deleted += 1
+    if purged or deleted:
+        print(f"🧹 Blob GC purged {purged} old job(s) and deleted {deleted} unreferenced blob(s).")
+    return deleted
+
+
+async def _gc_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.BLOB_GC_INTERVAL_SECONDS)
+        try:
+            await collect_garbage()
+        except Exception as e:
+            print(f"❌ Blob GC failed: {e}")
+
+
+def start_gc() -> None:
+    """Starts the periodic garbage collector. Must run inside the event loop."""
+    global _gc_task
+    if _gc_task is None:
+        _gc_task = asyncio.create_task(_gc_loop(), name="blob-gc")
+
+
+async def stop_gc() -> None:
+    global _gc_task
+    if _gc_task is not None:
+        _gc_task.cancel()
+        await asyncio.gather(_gc_task, return_exceptions=True)
+        _gc_task = None
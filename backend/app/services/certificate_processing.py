@@ -149,62 +149,217 @@ Updated: 2025-09-15
 This module provides functions for preparing certificate files for AI analysis,
 such as converting PDFs to images and scanning for QR codes.
 """
-import io
+import math
 import re
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from PIL import Image
-from pyzbar.pyzbar import decode as qr_decode
-from pdf2image import convert_from_bytes
+from pyzbar.pyzbar import ZBarSymbol, decode as qr_decode
+from pdf2image import convert_from_path
+from pypdf import PdfReader
+
+from app.core.config import settings
+from app.services.issuers import get_registry
+from app.utils import security
+from app.utils.imaging import open_image_reduced
 
 # --- Constants ---
-# Expanded list of known issuers to improve detection
-KNOWN_ISSUERS = [
-    ("coursera", "coursera.org"),
-    ("udemy", "udemy.com"),
-    ("accredible", "accredible.com"),
-    ("credly", "credly.com"),
-    ("edx", "edx.org"),
-    ("ibm", "ibm.com"),
-    ("cisco", "cisco.com"),
-    ("wadhwani", "wadhwani.foundation"),
-    ("skillvertex", "skillvertex.com"),
-    ("microsoft", "microsoft.com"),
-    ("google", "google.com"),
-    ("aws", "amazon.com")
-]
+# Known issuers live in the issuer registry (app/data/issuers.json, see app/services/issuers.py).
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"')\]]+", re.IGNORECASE)
+# Path fragments that mark a link as a credential check rather than a homepage or social link.
+VERIFICATION_LINK_HINTS = ("verify", "verification", "credential", "certificate", "badge", "accomplishments")
+
+def is_pdf(content_type: Optional[str]) -> bool:
+    return "pdf" in (content_type or "")
 
-def get_image_from_bytes(file_bytes: bytes, content_type: str) -> Optional[Image.Image]:
+def extract_pdf_text_layer(path: str, max_pages: Optional[int] = None) -> Tuple[str, List[str]]:
     """
-    Converts file bytes (PDF or image) into a single PIL Image object.
-    For PDFs, it uses the first page.
+    Reads the embedded text layer and link annotations of a born-digital PDF,
+    without rasterizing it. CPU-bound; runs in the CPU pool.
+
+    Args:
+        path: The spooled PDF upload.
+        max_pages: How many leading pages to read (default `PDF_MAX_PAGES`).
+
+    Returns:
+        A tuple of (page text, URLs from link annotations and the text itself).
+        Both are empty if the PDF cannot be parsed.
     """
+    max_pages = max_pages or settings.PDF_MAX_PAGES
+    texts: List[str] = []
+    urls: List[str] = []
     try:
-        if "pdf" in content_type:
-            images = convert_from_bytes(file_bytes, first_page=1, last_page=1)
+        reader = PdfReader(path)
+        for page in reader.pages[:max_pages]:
+            texts.append(page.extract_text() or "")
+            for annotation in page.get("/Annots") or []:
+                action = annotation.get_object().get("/A") or {}
+                uri = action.get("/URI") if hasattr(action, "get") else None
+                if isinstance(uri, str) and uri.lower().startswith(("http://", "https://")):
+                    urls.append(uri)
+    except Exception as e:
+        print(f"Error reading PDF text layer: {e}")
+        return "", []
+    text = "\n".join(texts).strip()
+    urls.extend(match.rstrip(".,;") for match in URL_PATTERN.findall(text))
+    return text, list(dict.fromkeys(urls))
+
+def has_usable_text(text: str) -> bool:
+    """True if a text layer holds enough real words to stand in for OCR."""
+    if not text:
+        return False
+    alnum = sum(1 for ch in text if ch.isalnum())
+    words = [w for w in re.split(r"\W+", text) if len(w) > 1]
+    # Scanned PDFs often carry an empty or garbage layer; require real words, not glyph soup.
+    return alnum >= settings.PDF_TEXT_MIN_CHARS and len(words) >= 5 and alnum / max(len(text), 1) >= 0.5
+
+def pick_verification_links(urls: List[str]) -> List[str]:
+    """Returns the URLs that look like credential verification links, in their original order."""
+    registry = get_registry()
+    picked = []
+    for url in urls:
+        lower = url.lower()
+        issuer = registry.issuer_for_url(url)
+        if (issuer and issuer.is_verification_url(url)) or any(hint in lower for hint in VERIFICATION_LINK_HINTS):
+            picked.append(url)
+    return picked
+
+def raster_dpi_for_page(width_pt: float, height_pt: float) -> int:
+    """
+    Returns the DPI to render a page at: `RASTER_DPI`, lowered so the bitmap
+    stays within `RASTER_MAX_PIXELS`. Page sizes are in PDF points (1/72 inch).
+    """
+    dpi = settings.RASTER_DPI
+    area_sq_in = (width_pt / 72.0) * (height_pt / 72.0)
+    if settings.RASTER_MAX_PIXELS and area_sq_in > 0:
+        dpi = min(dpi, int(math.sqrt(settings.RASTER_MAX_PIXELS / area_sq_in)))
+    return max(dpi, 36)
+
+def _raster_options(reader_source: Any, page_number: int = 1) -> Dict[str, Any]:
+    """Builds the pdf2image keyword arguments for the configured rasterization profile."""
+    dpi = settings.RASTER_DPI
+    try:
+        box = PdfReader(reader_source).pages[page_number - 1].mediabox
+        dpi = raster_dpi_for_page(float(box.width), float(box.height))
+    except Exception:
+        pass  # Let pdftoppm report unreadable files
+    return {
+        "dpi": dpi,
+        "grayscale": settings.RASTER_GRAYSCALE,
+        "thread_count": settings.RASTER_THREAD_COUNT,
+    }
+
+def count_pages(path: str, content_type: str) -> int:
+    """Returns how many pages of an upload to process: up to `PDF_MAX_PAGES` for PDFs, 1 otherwise."""
+    if not is_pdf(content_type):
+        return 1
+    try:
+        return max(1, min(len(PdfReader(path).pages), settings.PDF_MAX_PAGES))
+    except Exception:
+        return 1  # Let rasterization report the problem
+
+def get_image_from_file(path: str, content_type: str, page_number: int = 1) -> Optional[Image.Image]:
+    """
+    Converts a spooled upload (PDF or image) on disk into a single PIL Image object.
+    For PDFs, it renders `page_number` (1-based) with the configured raster profile.
+    Reads straight from the file, so the upload never has to be loaded into memory as bytes.
+    """
+    try:
+        if "pdf" in (content_type or ""):
+            images = convert_from_path(
+                path, first_page=page_number, last_page=page_number, **_raster_options(path, page_number)
+            )
             return images[0] if images else None
         else:
-            return Image.open(io.BytesIO(file_bytes)).convert("RGB")
+            return open_image_reduced(path, settings.CERTIFICATE_IMAGE_MAX_SIDE)
     except Exception as e:
         print(f"Error converting file to image: {e}")
         return None
 
-def scan_qr_from_image(pil_img: Image.Image) -> List[str]:
-    """Scans a PIL image for QR codes and returns their decoded data."""
+# Regions (left, top, right, bottom as fractions of the page) where certificates put their QR code.
+QR_CROP_REGIONS = [
+    (0.6, 0.6, 1.0, 1.0),   # bottom-right
+    (0.0, 0.6, 0.4, 1.0),   # bottom-left
+    (0.0, 0.7, 1.0, 1.0),   # footer strip
+    (0.6, 0.0, 1.0, 0.4),   # top-right
+    (0.0, 0.0, 0.4, 0.4),   # top-left
+]
+
+def _is_url_payload(payload: str) -> bool:
+    return bool(re.match(r"^(https?://|www\.)\S+$", payload.strip(), re.IGNORECASE))
+
+def _zbar_qr(gray_img: Image.Image) -> List[str]:
     try:
-        decoded = qr_decode(pil_img)
+        decoded = qr_decode(gray_img, symbols=[ZBarSymbol.QRCODE])
         return [d.data.decode("utf-8", errors="ignore") for d in decoded]
     except Exception:
         return []
 
+def _opencv_qr(gray_img: Image.Image) -> List[str]:
+    try:
+        import cv2
+        import numpy as np
+
+        found, payloads, _, _ = cv2.QRCodeDetector().detectAndDecodeMulti(np.asarray(gray_img))
+        return [p for p in payloads if p] if found else []
+    except Exception:
+        return []
+
+def rasterize_and_scan_page(path: str, content_type: str, page_number: int) -> Tuple[Optional[Image.Image], List[str]]:
+    """
+    Renders one page and scans it for QR codes, as a single CPU-pool task.
+
+    Returns:
+        A tuple of (page image or None, QR payloads found on the page).
+    """
+    image = get_image_from_file(path, content_type, page_number)
+    return image, (scan_qr_from_image(image) if image else [])
+
+def _urls_first(payloads: List[str]) -> List[str]:
+    return sorted(payloads, key=lambda p: not _is_url_payload(p))
+
+def scan_qr_from_image(pil_img: Image.Image) -> List[str]:
+    """
+    Scans a PIL image for QR codes and returns their decoded data (URLs first).
+
+    Strategies run cheapest first and stop as soon as a URL-shaped payload is found:
+      1. pyzbar on a grayscale copy downscaled to `QR_SCAN_MAX_SIDE`.
+      2. pyzbar on full-resolution crops of the corners and footer, where small codes usually sit.
+      3. OpenCV's `QRCodeDetector` on the whole page (if `QR_OPENCV_FALLBACK` is set).
+    """
+    try:
+        gray = pil_img.convert("L")
+    except Exception:
+        return []
+
+    found: List[str] = []
+    def add(payloads: List[str]) -> bool:
+        for payload in payloads:
+            if payload not in found:
+                found.append(payload)
+        return any(_is_url_payload(p) for p in found)
+
+    small = gray
+    if settings.QR_SCAN_MAX_SIDE and max(gray.size) > settings.QR_SCAN_MAX_SIDE:
+        small = gray.copy()
+        small.thumbnail((settings.QR_SCAN_MAX_SIDE, settings.QR_SCAN_MAX_SIDE), Image.BILINEAR)
+    if add(_zbar_qr(small)):
+        return _urls_first(found)
+
+    width, height = gray.size
+    for left, top, right, bottom in QR_CROP_REGIONS:
+        crop = gray.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+        if add(_zbar_qr(crop)):
+            return _urls_first(found)
+
+    if settings.QR_OPENCV_FALLBACK:
+        add(_opencv_qr(gray))
+    return _urls_first(found)
+
 def detect_issuer_from_text(text: str, qr_urls: List[str]) -> Optional[Dict[str, str]]:
-    """Detects a known certificate issuer from text content or QR URLs."""
-    lower_text = (text or "").lower()
-    all_content = lower_text + " ".join(qr_urls)
-    
-    for name, domain in KNOWN_ISSUERS:
-        if name in all_content or domain in all_content:
-            return {"name": name, "domain": domain}
-    return None
+    """Detects a known certificate issuer from QR URL hosts or (whole-word) mentions in the text."""
+    issuer = get_registry().detect(text, qr_urls)
+    return issuer.as_dict() if issuer else None
 
 def name_matches_authenticated(username: str, extracted_text: str) -> bool:
     """Checks if the authenticated username appears in the extracted text."""
@@ -220,3 +375,11 @@ def name_matches_authenticated(username: str, extracted_text: str) -> bool:
     
     return matches >= 2 if len(user_tokens) >= 2 else matches >= 1
 
+
+def encrypt_upload_to(src_path: str, dst_path: str) -> None:
+    """
+    Encrypts a spooled upload into `dst_path` using the chunked binary blob format,
+    streaming in constant memory. Blocking; call it off the event loop.
+    """
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        security.encrypt_stream(src, dst)
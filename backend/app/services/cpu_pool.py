@@ -0,0 +1,114 @@
+# File: app/services/cpu_pool.py
+
+"""
+CPU Worker Pool
+
+Author: Mandar K.
+Date: 2025-09-21
+
+This module manages a `ProcessPoolExecutor` for CPU-bound stages such as PDF
+rasterization, QR decoding, image re-encoding and face analysis, so that the
+asyncio event loop only ever waits on I/O. Worker processes are pre-forked at
+startup with the heavy imaging libraries already imported. If a worker dies
+(OOM kill, a segfault in a native library), the broken pool is replaced and the
+task is retried once.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _warm_worker() -> None:
+    """Initializer run once in each worker process: import the imaging stack up front."""
+    import cv2  # noqa: F401
+    import numpy  # noqa: F401
+    from PIL import Image  # noqa: F401
+    from pyzbar import pyzbar  # noqa: F401
+    from pdf2image import convert_from_bytes  # noqa: F401
+    import pytesseract  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+def start() -> None:
+    """Creates the process pool and forces every worker to start (and import) immediately."""
+    global _executor
+    if _executor is not None:
+        return
+    workers = _worker_count()
+    _executor = _new_executor()
+    # ProcessPoolExecutor spawns lazily; submit one no-op per worker so they all fork now.
+    for future in [_executor.submit(_noop) for _ in range(workers)]:
+        future.result()
+    print(f"✅ CPU pool started with {workers} worker process(es).")
+
+
+def _worker_count() -> int:
+    return settings.CPU_POOL_WORKERS or os.cpu_count() or 1
+
+
+def _new_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=_worker_count(), initializer=_warm_worker)
+
+
+def _replace_broken(broken: ProcessPoolExecutor) -> Optional[ProcessPoolExecutor]:
+    """Swaps a broken pool for a fresh one (once, however many tasks saw it break) and returns the current pool."""
+    global _executor
+    with _lock:
+        if _executor is broken:
+            print("⚠️ A CPU pool worker died; replacing the pool.")
+            broken.shutdown(wait=False, cancel_futures=True)
+            _executor = _new_executor()
+        return _executor
+
+
+def shutdown() -> None:
+    """Stops the process pool, cancelling work that has not started yet."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def run(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a picklable, module-level function in the CPU pool and awaits its result.
+
+    If the pool has not been started (e.g. in scripts), the default thread pool
+    is used instead so the event loop is still never blocked.
+
+    Args:
+        func: The function to run. Must be importable by the worker processes.
+        *args: Positional arguments (must be picklable).
+        **kwargs: Keyword arguments (must be picklable).
+
+    Returns:
+        Whatever `func` returns.
+
+    Raises:
+        BrokenProcessPool: If the task's worker died again on the retry.
+    """
+    loop = asyncio.get_running_loop()
+    call = partial(func, *args, **kwargs)
+    executor = _executor
+    try:
+        return await loop.run_in_executor(executor, call)
+    except BrokenProcessPool:
+        if executor is None:
+            raise
+        replacement = _replace_broken(executor)
+        if replacement is None:
+            raise  # Shut down meanwhile
+        return await loop.run_in_executor(replacement, call)
@@ -14,6 +14,9 @@ from typing import Dict, Any, List
 import cv2
 import numpy as np
 
+from app.core.config import settings
+from app.utils.imaging import ImageTooLargeError, decode_cv2_reduced
+
 # Conditionally import face_recognition
 try:
     import face_recognition
@@ -31,16 +34,17 @@ def analyze_face_image(image_bytes: bytes) -> Dict[str, Any]:
     :return: A dictionary containing analysis results.
     """
     try:
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if image is None:
-            return {"error": "Invalid or unsupported image format."}
+        # Decoded at reduced scale (and upright); face locations are mapped back to original pixels.
+        try:
+            image, (original_width, original_height) = decode_cv2_reduced(image_bytes, settings.FACE_IMAGE_MAX_SIDE)
+        except (ImageTooLargeError, ValueError) as e:
+            return {"error": str(e)}
+        scale = original_width / image.shape[1]
 
         rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
         result = {
-            "image_dimensions": {"width": image.shape[1], "height": image.shape[0]},
+            "image_dimensions": {"width": original_width, "height": original_height},
             "face_detected": False,
             "face_count": 0,
             "quality_score": 0.0,
@@ -49,7 +53,7 @@ def analyze_face_image(image_bytes: bytes) -> Dict[str, Any]:
         if FACE_RECOGNITION_AVAILABLE:
             face_locations = face_recognition.face_locations(rgb_image)
             result.update({
-                "face_locations": face_locations,
+                "face_locations": [tuple(round(v * scale) for v in location) for location in face_locations],
                 "face_count": len(face_locations),
                 "face_detected": len(face_locations) > 0,
             })
@@ -72,7 +76,7 @@ def analyze_face_image(image_bytes: bytes) -> Dict[str, Any]:
             faces = face_cascade.detectMultiScale(gray, 1.1, 4)
             
             result.update({
-                "face_locations": faces.tolist(),
+                "face_locations": [[round(v * scale) for v in face] for face in np.asarray(faces).tolist()],
                 "face_count": len(faces),
                 "face_detected": len(faces) > 0,
             })
@@ -0,0 +1,77 @@
+# File: app/services/http_client.py
+
+"""
+Shared HTTP Clients
+
+Author: Mandar K.
+Date: 2025-09-21
+
+This module owns the application-scoped `httpx.AsyncClient` instances, one per
+upstream, so connections (and their TCP/TLS handshakes) are reused across jobs
+instead of being opened and torn down on every call. Clients are created in
+the app lifespan and closed on shutdown.
+"""
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# --- Upstream names ---
+HUGGINGFACE = "huggingface"      # Hugging Face Inference API (OCR + LLM)
+VERIFICATION_PAGES = "pages"     # Issuer verification pages (Coursera, Credly, ...)
+DOWNSTREAM_SERVER = "server"     # Our Node.js webhook
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=settings.HTTP2_ENABLED and HTTP2_AVAILABLE,
+        timeout=settings.POST_TIMEOUT_SECONDS,
+        # Issuer pages routinely redirect (short links, locale redirects)
+        follow_redirects=(name == VERIFICATION_PAGES),
+    )
+
+
+def start() -> None:
+    """Creates one pooled client per upstream."""
+    for name in (HUGGINGFACE, VERIFICATION_PAGES, DOWNSTREAM_SERVER):
+        if name not in _clients:
+            _clients[name] = _build_client(name)
+    protocol = "HTTP/2" if settings.HTTP2_ENABLED and HTTP2_AVAILABLE else "HTTP/1.1"
+    print(f"✅ Shared HTTP clients ready ({protocol}, max {settings.HTTP_MAX_CONNECTIONS} connections each).")
+
+
+async def close() -> None:
+    """Closes every client and its pooled connections."""
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    Returns the shared client for an upstream, creating it lazily if the
+    lifespan has not run (e.g. when services are used from a script).
+
+    Args:
+        name: One of `HUGGINGFACE`, `VERIFICATION_PAGES` or `DOWNSTREAM_SERVER`.
+    """
+    client: Optional[httpx.AsyncClient] = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
@@ -9,24 +9,116 @@ Date: 2025-09-15
 This module encapsulates all interactions with the Hugging Face Inference API,
 including text extraction from images and AI-powered verification analysis.
 """
+import asyncio
+import base64
+import hashlib
 import httpx
 import io
 import json
-import re
+import time
 from PIL import Image
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from app.core.config import settings
+from app.services import cpu_pool, http_client
+from app.services import resilience
+from app.services.batching import MicroBatcher
+from app.services.resilience import CircuitBreaker, ModelLoadingError, UpstreamUnavailableError
+from app.utils.cache import MemoryLRUCache, PersistentCache, SingleFlight, TwoTierCache
 
 # --- Model Endpoints ---
 # CORRECTED: Switched to a smaller, more reliably available OCR model to fix the 404 error.
 OCR_MODEL_URL = "https://api-inference.huggingface.co/models/microsoft/trocr-small-printed"
 VERIFICATION_MODEL_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
 
+# --- OCR Result Cache ---
+# Keyed by model + a hash of the normalized pixels, so identical renders never hit TrOCR twice.
+ocr_cache = TwoTierCache(
+    MemoryLRUCache(settings.OCR_CACHE_MEMORY_MAX_BYTES),
+    PersistentCache(
+        settings.CACHE_DB_PATH, "ocr_results",
+        ttl_seconds=settings.OCR_CACHE_TTL_SECONDS,
+        max_bytes=settings.OCR_CACHE_DISK_MAX_BYTES,
+    ),
+)
+_ocr_flight = SingleFlight()
+
+# --- AI Verification Cache ---
+# Bump whenever a prompt changes so stale verdicts are never reused.
+PROMPT_VERSION = "v1"
+COMPACT_PROMPT_VERSION = "c1"
+verification_cache = TwoTierCache(
+    MemoryLRUCache(settings.LLM_CACHE_MEMORY_MAX_BYTES),
+    PersistentCache(
+        settings.CACHE_DB_PATH, "ai_verifications",
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        max_bytes=settings.LLM_CACHE_DISK_MAX_BYTES,
+    ),
+)
+_verification_flight = SingleFlight()
+
+# Compact output schema keys -> full verdict keys.
+_COMPACT_VERDICT_KEYS = {"v": "is_valid", "c": "confidence_score", "r": "reasoning", "n": "matched_name", "i": "issuer"}
+# Rough characters-per-token ratio for Mistral on English text; only used to size the text budget.
+_CHARS_PER_TOKEN = 4
+
+def _generation_parameters() -> Dict[str, Any]:
+    return {"max_new_tokens": settings.LLM_MAX_NEW_TOKENS, "temperature": 0.1, "return_full_text": False}
+
+def _prompt_version() -> str:
+    if settings.LLM_COMPACT_PROMPT:
+        return f"{COMPACT_PROMPT_VERSION}-{settings.LLM_TEXT_TOKEN_BUDGET}"
+    return PROMPT_VERSION
+
+def image_fingerprint(pil_image: Image.Image) -> str:
+    """Hashes an image's normalized (RGB) pixels and dimensions. CPU-bound; runs in the CPU pool."""
+    normalized = pil_image.convert("RGB")
+    digest = hashlib.sha256(f"{normalized.width}x{normalized.height}:".encode())
+    digest.update(normalized.tobytes())
+    return digest.hexdigest()
+
+def ocr_cache_stats() -> Dict[str, Any]:
+    """Hit-rate counters and tier sizes for the OCR cache."""
+    return {**ocr_cache.stats(), "coalesced": _ocr_flight.coalesced, "batching": _ocr_batcher.stats()}
+
+def verification_cache_stats() -> Dict[str, Any]:
+    """Hit-rate counters and tier sizes for the AI verification cache."""
+    return {**verification_cache.stats(), "coalesced": _verification_flight.coalesced, "batching": _verification_batcher.stats()}
+
+def is_well_formed_verdict(analysis: Dict[str, Any]) -> bool:
+    """True if `analysis` is a verdict parsed from the model, not an error fallback."""
+    return isinstance(analysis, dict) and isinstance(analysis.get("is_valid"), bool) and "error" not in analysis
+
+OCR_UPLOAD_FORMATS = {"png": ("PNG", "image/png"), "jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+def _ocr_upload_format() -> str:
+    fmt = settings.OCR_UPLOAD_FORMAT.lower()
+    return fmt if fmt in OCR_UPLOAD_FORMATS else "png"
+
+def encode_image_for_upload(pil_image: Image.Image, fmt: Optional[str] = None, quality: Optional[int] = None) -> bytes:
+    """
+    Encodes an image for the OCR upload in the configured format
+    (`OCR_UPLOAD_FORMAT`, `OCR_UPLOAD_QUALITY`). CPU-bound; runs in the CPU pool.
+    """
+    fmt = fmt or _ocr_upload_format()
+    quality = quality or settings.OCR_UPLOAD_QUALITY
+    img_byte_arr = io.BytesIO()
+    if fmt == "png":
+        # Lossless; optimize trades a little CPU for a smaller upload
+        pil_image.save(img_byte_arr, format="PNG", optimize=True)
+    else:
+        if pil_image.mode not in ("RGB", "L"):
+            pil_image = pil_image.convert("RGB")
+        pil_image.save(img_byte_arr, format=OCR_UPLOAD_FORMATS[fmt][0], quality=quality)
+    return img_byte_arr.getvalue()
+
 async def extract_text_from_image(pil_image: Image.Image) -> Optional[str]:
     """
     Uses a Hugging Face OCR model to extract text from a certificate image.
 
+    Results are cached by pixel hash, and concurrent requests for the same
+    image are coalesced so only one of them goes upstream.
+
     Args:
         pil_image: A PIL Image object of the certificate.
 
@@ -36,24 +128,90 @@ async def extract_text_from_image(pil_image: Image.Image) -> Optional[str]:
     if not pil_image:
         return None
 
-    img_byte_arr = io.BytesIO()
-    # Convert image to PNG for consistency, as it's a lossless format
-    pil_image.save(img_byte_arr, format='PNG')
-    image_bytes = img_byte_arr.getvalue()
+    fingerprint = await cpu_pool.run(image_fingerprint, pil_image)
+    # Lossy encodings can change what the model reads, so they get their own entries.
+    fmt = _ocr_upload_format()
+    encoding = "" if fmt == "png" else f"{fmt}{settings.OCR_UPLOAD_QUALITY}:"
+    cache_key = f"{OCR_MODEL_URL}:{encoding}{fingerprint}"
+    cached_text = ocr_cache.get(cache_key)
+    if cached_text is not None:
+        print("✅ AI OCR result served from cache.")
+        return cached_text
+
+    return await _ocr_flight.do(cache_key, lambda: _request_ocr(pil_image, cache_key))
+
+async def _request_ocr(pil_image: Image.Image, cache_key: str) -> Optional[str]:
+    """Sends an image to the OCR model (via the micro-batcher) and caches a successful result."""
+    image_bytes = await cpu_pool.run(encode_image_for_upload, pil_image)
+    text = await _ocr_batcher.submit(image_bytes)
+    if text is not None:
+        ocr_cache.set(cache_key, text)
+    return text
+
+async def _ocr_batch(images: List[bytes]) -> List[Optional[str]]:
+    """
+    Runs one micro-batch of OCR requests.
+
+    The serverless image-to-text endpoint takes one raw image per request, so by
+    default the batch's requests are sent together over the shared connection.
+    With `HF_OCR_BATCH_INPUTS` (for dedicated Inference Endpoints that accept
+    JSON lists of base64 images) the whole batch goes in a single request.
+    """
+    if settings.HF_OCR_BATCH_INPUTS and len(images) > 1:
+        texts = await _post_ocr_batch(images)
+        if texts is not None:
+            return texts
+    return list(await asyncio.gather(*(_post_ocr(image_bytes) for image_bytes in images), return_exceptions=True))
 
+def _generated_texts(result: Any, expected: int) -> Optional[List[Optional[str]]]:
+    """
+    Extracts one `generated_text` per input from a batched inference response.
+
+    Batched responses are either a flat list of `{"generated_text": ...}` or a
+    list with one such list per input. Returns None if the shape does not match.
+    """
+    if not isinstance(result, list) or len(result) != expected:
+        return None
+    texts: List[Optional[str]] = []
+    for item in result:
+        if isinstance(item, list):
+            item = item[0] if item else {}
+        texts.append(item.get("generated_text") if isinstance(item, dict) else None)
+    return texts
+
+async def _post_ocr_batch(images: List[bytes]) -> Optional[List[Optional[str]]]:
     headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+    payload = {"inputs": [base64.b64encode(image_bytes).decode("ascii") for image_bytes in images]}
+    try:
+        response = await _hf_post(_ocr_breaker, OCR_MODEL_URL, headers=headers, json=payload)
+        texts = _generated_texts(response.json(), len(images))
+        if texts is not None:
+            print(f"✅ AI OCR extracted text for a batch of {len(images)} images.")
+            return texts
+        print("⚠️ OCR model returned an unexpected batch response; retrying items individually.")
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        print(f"⚠️ Batched OCR request failed ({e}); retrying items individually.")
+    return None
+
+async def _post_ocr(image_bytes: bytes) -> Optional[str]:
+    """Sends a single image to the OCR model."""
+    headers = {
+        "Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}",
+        "Content-Type": OCR_UPLOAD_FORMATS[_ocr_upload_format()][1],
+    }
     
     try:
-        # Increased timeout to give the model more time to load if it's cold
-        async with httpx.AsyncClient(timeout=45.0) as client:
-            response = await client.post(OCR_MODEL_URL, headers=headers, data=image_bytes)
-            response.raise_for_status()
-            result = response.json()
-            if result and isinstance(result, list) and 'generated_text' in result[0]:
-                print(f"✅ AI OCR successfully extracted text.")
-                return result[0]['generated_text']
+        response = await _hf_post(_ocr_breaker, OCR_MODEL_URL, headers=headers, content=image_bytes)
+        result = response.json()
+        if result and isinstance(result, list) and 'generated_text' in result[0]:
+            print(f"✅ AI OCR successfully extracted text.")
+            return result[0]['generated_text']
         print(" OCR model returned an unexpected response format.")
         return None
+    except UpstreamUnavailableError:
+        raise
     except httpx.HTTPStatusError as e:
         print(f"❌ Hugging Face OCR HTTP Error: {e.response.status_code} - {e.response.text}")
         return None
@@ -65,6 +223,9 @@ async def get_ai_verification(text: str, qr_url: Optional[str], student_name: st
     """
     Asks a Hugging Face LLM to verify the certificate based on its content.
 
+    Well-formed verdicts are cached by (normalized text, QR URL, student name,
+    model, prompt version); concurrent identical requests share one call.
+
     Args:
         text: The text extracted from the certificate.
         qr_url: The verification URL from a QR code, if present.
@@ -73,7 +234,28 @@ async def get_ai_verification(text: str, qr_url: Optional[str], student_name: st
     Returns:
         A dictionary containing the AI's structured analysis.
     """
-    prompt = f"""
+    normalized_text = " ".join((text or "").split())
+    cache_key = hashlib.sha256(json.dumps(
+        [normalized_text, qr_url, " ".join(student_name.lower().split()), VERIFICATION_MODEL_URL, _prompt_version()]
+    ).encode("utf-8")).hexdigest()
+
+    cached_verdict = verification_cache.get(cache_key)
+    if cached_verdict is not None:
+        print("✅ AI Verifier result served from cache.")
+        return cached_verdict
+
+    if settings.LLM_COMPACT_PROMPT:
+        prompt = _build_compact_verification_prompt(normalized_text, qr_url, student_name)
+    else:
+        prompt = _build_verification_prompt(normalized_text, qr_url, student_name)
+    verdict = await _verification_flight.do(cache_key, lambda: _verification_batcher.submit(prompt))
+    if is_well_formed_verdict(verdict):
+        verification_cache.set(cache_key, verdict)
+    return verdict
+
+def _build_verification_prompt(text: str, qr_url: Optional[str], student_name: str) -> str:
+    """Builds the verification prompt. Changes here must bump `PROMPT_VERSION`."""
+    return f"""
     You are an expert certificate verifier. Your task is to determine if a digital certificate is authentic and belongs to the specified recipient based on the evidence provided.
 
     **CRITICAL INSTRUCTIONS:**
@@ -100,27 +282,343 @@ async def get_ai_verification(text: str, qr_url: Optional[str], student_name: st
     }}
     """
 
+def trim_to_token_budget(text: str, max_tokens: int) -> str:
+    """
+    Shortens certificate text to roughly `max_tokens` tokens. Keeps the head
+    (title, recipient, course) and a shorter tail (dates, IDs, signatures).
+    """
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    if max_tokens <= 0 or len(text) <= max_chars:
+        return text
+    head = (max_chars * 2) // 3
+    tail = max_chars - head
+    return f"{text[:head]} ... {text[-tail:]}"
+
+def _build_compact_verification_prompt(text: str, qr_url: Optional[str], student_name: str) -> str:
+    """A short prompt with a compact output schema. Changes here must bump `COMPACT_PROMPT_VERSION`."""
+    text = trim_to_token_budget(text, settings.LLM_TEXT_TOKEN_BUDGET)
+    return (
+        "[INST] Verify a certificate. A plausible issuer verification URL is the strongest proof. "
+        "URL + recipient name in text = valid; name without URL = suspicious (v=false, c>=0.5); "
+        "no name = invalid (v=false, c<0.5).\n"
+        f"RECIPIENT: {student_name}\n"
+        f"URL: {qr_url or 'none'}\n"
+        f"TEXT: {text}\n"
+        'Reply with JSON only: {"v": bool valid, "c": 0-1 confidence, "r": "one short sentence", '
+        '"n": "matched name or null", "i": "issuer or null"} [/INST]'
+    )
+
+async def _verification_batch(prompts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Runs one micro-batch of verification prompts. With `HF_LLM_BATCH_INPUTS`
+    (for endpoints that accept a list of `inputs`) the batch goes in a single
+    text-generation request; otherwise each prompt is sent on its own,
+    concurrently over the shared connection. A batched request that is
+    rejected (4xx) or not answered with one generation per input is retried
+    one prompt at a time.
+    """
+    if len(prompts) == 1 or not settings.HF_LLM_BATCH_INPUTS:
+        return await _each_ai_verification(prompts)
+
     headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
-    payload = {"inputs": prompt, "parameters": {"max_new_tokens": 300, "temperature": 0.1, "return_full_text": False}}
+    payload = {"inputs": prompts, "parameters": _generation_parameters()}
+    try:
+        response = await _hf_post(_verification_breaker, VERIFICATION_MODEL_URL, headers=headers, json=payload)
+        texts = _generated_texts(response.json(), len(prompts))
+    except UpstreamUnavailableError:
+        raise
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            # The breaker has counted the failure; retrying each prompt would only multiply it.
+            print(f"❌ Hugging Face Verification HTTP Error: {e.response.status_code} - {e.response.text}")
+            return [_http_error_verdict(e.response.status_code) for _ in prompts]
+        # A 4xx is about the request shape (e.g. list inputs unsupported), not the prompts.
+        print(f"⚠️ Batched AI verification rejected (HTTP {e.response.status_code}); retrying items individually.")
+        texts = None
+    except Exception as e:
+        print(f"⚠️ Batched AI verification failed ({e}); retrying items individually.")
+        texts = None
+    if texts is None:
+        return await _each_ai_verification(prompts)
+    print(f"✅ AI Verifier answered a batch of {len(prompts)} prompts.")
+    return [_parse_verdict(text) for text in texts]
 
+async def _each_ai_verification(prompts: List[str]) -> List[Any]:
+    # One request per prompt; an exception (e.g. UpstreamUnavailableError) goes to that prompt's caller only.
+    return list(await asyncio.gather(*(_single_ai_verification(prompt) for prompt in prompts), return_exceptions=True))
+
+async def _single_ai_verification(prompt: str) -> Dict[str, Any]:
+    """Verifies one prompt, streamed (stopping at the closing brace) when `LLM_STREAMING` is on."""
+    if settings.LLM_STREAMING:
+        return await _stream_ai_verification(prompt)
+    return await _request_ai_verification(prompt)
+
+async def _request_ai_verification(prompt: str) -> Dict[str, Any]:
+    """Sends the prompt to the verification model and parses its JSON verdict."""
+    headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+    payload = {"inputs": prompt, "parameters": _generation_parameters()}
+
+    try:
+        response = await _hf_post(_verification_breaker, VERIFICATION_MODEL_URL, headers=headers, json=payload)
+        result = response.json()
+        generated_text = None
+        if result and isinstance(result, list) and 'generated_text' in result[0]:
+            generated_text = result[0]['generated_text']
+        return _parse_verdict(generated_text)
+    except UpstreamUnavailableError:
+        raise
+    except httpx.HTTPStatusError as e:
+        print(f"❌ Hugging Face Verification HTTP Error: {e.response.status_code} - {e.response.text}")
+        return _http_error_verdict(e.response.status_code)
+    except Exception as e:
+        print(f"❌ Hugging Face Verification General Error: {e}")
+        return {"is_valid": False, "confidence_score": 0.0, "reasoning": f"An error occurred during AI analysis: {str(e)}", "error": "exception"}
+
+async def _stream_ai_verification(prompt: str) -> Dict[str, Any]:
+    """
+    Streams the verification model's tokens (server-sent events) and stops
+    reading as soon as the first balanced JSON object is complete. Closing the
+    stream early ends generation upstream, so no tokens are spent after the verdict.
+    """
+    headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+    payload = {"inputs": prompt, "parameters": _generation_parameters(), "stream": True}
+    scanner = JsonObjectScanner()
+    breaker = _verification_breaker
+
+    breaker.before_call()
+    started = time.monotonic()
     try:
-        async with httpx.AsyncClient(timeout=45.0) as client:
-            response = await client.post(VERIFICATION_MODEL_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            if result and isinstance(result, list) and 'generated_text' in result[0]:
-                generated_text = result[0]['generated_text']
-                # Clean the output to find the JSON blob
-                json_str_match = re.search(r'\{.*\}', generated_text, re.DOTALL)
-                if json_str_match:
-                    print("✅ AI Verifier returned a valid JSON response.")
-                    return json.loads(json_str_match.group(0))
-        print("❌ AI Verifier returned an unexpected response format.")
-        return {"is_valid": False, "confidence_score": 0.1, "reasoning": "Failed to get a valid JSON response from the AI model."}
+        client = http_client.get_client(http_client.HUGGINGFACE)
+        async with client.stream("POST", VERIFICATION_MODEL_URL, headers=headers, json=payload, timeout=breaker.timeout()) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                _check_upstream_status(breaker, response)
+            tokens = 0
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):].strip())
+                if event.get("error"):
+                    raise RuntimeError(event["error"])
+                token = (event.get("token") or {}).get("text") or ""
+                tokens += 1
+                verdict = scanner.feed(token)
+                if verdict is not None:
+                    breaker.record_success(time.monotonic() - started)
+                    print(f"✅ AI Verifier verdict complete after {tokens} streamed tokens; closing stream.")
+                    return _expand_verdict(verdict)
+        breaker.record_success(time.monotonic() - started)
+        return _parse_verdict(scanner.text)
+    except UpstreamUnavailableError:
+        raise
+    except asyncio.CancelledError:
+        breaker.release_probe()
+        raise
+    except httpx.TransportError as e:
+        breaker.record_failure(type(e).__name__)
+        print(f"❌ Hugging Face Verification General Error: {e}")
+        return {"is_valid": False, "confidence_score": 0.0, "reasoning": f"An error occurred during AI analysis: {str(e)}", "error": "exception"}
     except httpx.HTTPStatusError as e:
         print(f"❌ Hugging Face Verification HTTP Error: {e.response.status_code} - {e.response.text}")
-        return {"is_valid": False, "confidence_score": 0.0, "reasoning": f"AI analysis failed with HTTP status {e.response.status_code}."}
+        return _http_error_verdict(e.response.status_code)
     except Exception as e:
+        breaker.release_probe()
         print(f"❌ Hugging Face Verification General Error: {e}")
-        return {"is_valid": False, "confidence_score": 0.0, "reasoning": f"An error occurred during AI analysis: {str(e)}"}
+        return {"is_valid": False, "confidence_score": 0.0, "reasoning": f"An error occurred during AI analysis: {str(e)}", "error": "exception"}
+
+class JsonObjectScanner:
+    """
+    Incrementally finds the first balanced top-level JSON object in streamed
+    text. Braces inside JSON strings (and escaped quotes) are ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._pos = 0
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Adds text; returns the parsed object once it closes, else None."""
+        self.text += chunk
+        while self._pos < len(self.text):
+            ch = self.text[self._pos]
+            self._pos += 1
+            if self._start < 0:
+                if ch == "{":
+                    self._start, self._depth = self._pos - 1, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self.text[self._start:self._pos]
+                    try:
+                        parsed = json.loads(candidate)
+                    except json.JSONDecodeError:
+                        parsed = None
+                    self._start = -1
+                    if isinstance(parsed, dict):
+                        return parsed
+        return None
+
+def _expand_verdict(verdict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Maps a compact-schema verdict ({"v", "c", ...}) onto the full keys and
+    checks it. A verdict without a boolean `is_valid` and a numeric
+    `confidence_score` becomes a `bad_response` error verdict; optional keys
+    get defaults.
+    """
+    if "is_valid" not in verdict and "v" in verdict:
+        verdict = {full: verdict[short] for short, full in _COMPACT_VERDICT_KEYS.items() if short in verdict}
+    is_valid, confidence = verdict.get("is_valid"), verdict.get("confidence_score")
+    if not isinstance(is_valid, bool) or isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+        print("❌ AI Verifier returned an incomplete verdict.")
+        return _bad_response_verdict()
+    return {
+        **verdict,
+        "confidence_score": min(max(float(confidence), 0.0), 1.0),
+        "reasoning": verdict.get("reasoning") or "",
+        "matched_name": verdict.get("matched_name"),
+        "issuer": verdict.get("issuer"),
+    }
+
+def _parse_verdict(generated_text: Optional[str]) -> Dict[str, Any]:
+    """Pulls the first JSON verdict out of the model's generated text."""
+    if generated_text:
+        verdict = JsonObjectScanner().feed(generated_text)
+        if verdict is not None:
+            print("✅ AI Verifier returned a JSON response.")
+            return _expand_verdict(verdict)
+    print("❌ AI Verifier returned an unexpected response format.")
+    return _bad_response_verdict()
+
+def _bad_response_verdict() -> Dict[str, Any]:
+    return {"is_valid": False, "confidence_score": 0.1, "reasoning": "Failed to get a valid JSON response from the AI model.", "error": "bad_response"}
+
+def _http_error_verdict(status_code: int) -> Dict[str, Any]:
+    return {"is_valid": False, "confidence_score": 0.0, "reasoning": f"AI analysis failed with HTTP status {status_code}.", "error": "http_error"}
+
+# --- Resilience ---
+_ocr_breaker = resilience.get_breaker("ocr")
+_verification_breaker = resilience.get_breaker("ai-verification")
+
+async def _hf_post(breaker: CircuitBreaker, url: str, sample_latency: bool = True, **kwargs: Any) -> httpx.Response:
+    """
+    POSTs to a Hugging Face endpoint through its circuit breaker, with an
+    adaptive timeout and (if enabled) a hedged second attempt. With
+    `sample_latency=False` the call's latency is kept out of the breaker's
+    timeout window.
+
+    Raises:
+        UpstreamUnavailableError: If the circuit is open, the model is loading or the API is rate limiting.
+        httpx.HTTPStatusError: For other error responses.
+        httpx.TransportError: On timeouts and connection failures.
+    """
+    breaker.before_call()
+    client = http_client.get_client(http_client.HUGGINGFACE)
+    timeout = breaker.timeout()
+    started = time.monotonic()
+    try:
+        response = await resilience.hedged(breaker, lambda: client.post(url, timeout=timeout, **kwargs))
+    except httpx.TransportError as e:
+        breaker.record_failure(type(e).__name__)
+        raise
+    except BaseException:
+        breaker.release_probe()
+        raise
+    _check_upstream_status(breaker, response)
+    breaker.record_success(time.monotonic() - started if sample_latency else None)
+    return response
+
+def _check_upstream_status(breaker: CircuitBreaker, response: httpx.Response) -> None:
+    """
+    Maps an error response (body already read) onto the breaker. A 503 with
+    `estimated_time` means the model is loading: the circuit opens until it
+    should be ready and the caller gets `ModelLoadingError`. 429 does the same
+    with `Retry-After`.
+    """
+    status = response.status_code
+    if status < 400:
+        return
+    if status == 503:
+        try:
+            estimated = float(response.json().get("estimated_time"))
+        except Exception:
+            estimated = None
+        if estimated is not None:
+            wait = min(max(estimated, 1.0), settings.HF_MAX_DEFER_SECONDS)
+            breaker.open_for(wait, "model loading")
+            raise ModelLoadingError(f"{breaker.name} model is loading (~{estimated:.0f}s).", retry_after=wait)
+    if status == 429:
+        try:
+            wait = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            wait = breaker.reset_seconds
+        wait = min(max(wait, 1.0), settings.HF_MAX_DEFER_SECONDS)
+        breaker.open_for(wait, "rate limited")
+        raise UpstreamUnavailableError(f"{breaker.name} is rate limited.", retry_after=wait)
+    if status >= 500:
+        breaker.record_failure(f"HTTP {status}")
+    else:
+        breaker.release_probe()
+    response.raise_for_status()
+
+# --- Warm-up pings ---
+# Minimal real inferences that load a cold model (and keep the pooled connection open) without
+# touching the caches or batchers. Each returns True on success and raises UpstreamUnavailableError
+# while the model is loading.
+_PING_IMAGE_BYTES: Optional[bytes] = None
+
+async def ping_ocr() -> bool:
+    """Sends a tiny blank image to the OCR model."""
+    global _PING_IMAGE_BYTES
+    if _PING_IMAGE_BYTES is None:
+        _PING_IMAGE_BYTES = encode_image_for_upload(Image.new("L", (32, 32), color=255))
+    headers = {
+        "Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}",
+        "Content-Type": OCR_UPLOAD_FORMATS[_ocr_upload_format()][1],
+    }
+    return await _ping(_ocr_breaker, OCR_MODEL_URL, headers=headers, content=_PING_IMAGE_BYTES)
+
+async def ping_verification() -> bool:
+    """Asks the verification model for a single token."""
+    headers = {"Authorization": f"Bearer {settings.HUGGINGFACE_API_KEY}"}
+    payload = {"inputs": "OK", "parameters": {"max_new_tokens": 1, "return_full_text": False}}
+    return await _ping(_verification_breaker, VERIFICATION_MODEL_URL, headers=headers, json=payload)
+
+async def _ping(breaker: CircuitBreaker, url: str, **kwargs: Any) -> bool:
+    try:
+        # A one-token ping is far faster than a real call; sampling it would shrink the adaptive timeout.
+        await _hf_post(breaker, url, sample_latency=False, **kwargs)
+        return True
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        print(f"⚠️ {breaker.name} warm-up ping failed: {e}")
+        return False
+
+# --- Micro-batchers ---
+# Calls from concurrent jobs that arrive within HF_BATCH_WINDOW_MS share one upstream round trip.
+# Without the *_BATCH_INPUTS flags a batch is just parallel requests, so calls skip the window.
+_ocr_batcher = MicroBatcher(
+    "ocr", _ocr_batch, settings.HF_BATCH_MAX_SIZE, settings.HF_BATCH_WINDOW_MS / 1000.0,
+    enabled=lambda: settings.HF_OCR_BATCH_INPUTS,
+)
+_verification_batcher = MicroBatcher(
+    "ai-verification", _verification_batch, settings.HF_BATCH_MAX_SIZE, settings.HF_BATCH_WINDOW_MS / 1000.0,
+    enabled=lambda: settings.HF_LLM_BATCH_INPUTS,
+)
 
@@ -0,0 +1,202 @@
+# File: app/services/issuers.py
+
+"""
+Issuer Registry
+
+Author: Mandar K.
+Date: 2025-10-01
+
+This module loads the registry of known certificate issuers (names, aliases,
+domains and verification-URL patterns) from a JSON data file and compiles it
+once into:
+
+  * an Aho-Corasick automaton over every alias, matched against the
+    certificate text in a single pass with word-boundary semantics, and
+  * a domain index, looked up with the host of each QR / link URL.
+
+Both lookups cost the same whether the registry holds ten issuers or ten
+thousand. See `scripts/benchmark_issuers.py`.
+"""
+import json
+import os
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional, Pattern
+from urllib.parse import urlparse
+
+from app.core.config import settings
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "issuers.json")
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and collapses every run of non-alphanumerics to one space, padded at both ends."""
+    return f" {_NON_ALNUM.sub(' ', (text or '').lower()).strip()} "
+
+
+class Issuer:
+    """One registry entry."""
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.name: str = entry["name"]
+        self.display_name: str = entry.get("display_name") or self.name
+        self.aliases: List[str] = entry.get("aliases") or [self.name]
+        self.domains: List[str] = [d.lower() for d in entry.get("domains") or []]
+        # Patterns are written as "host/path-prefix"; anchor them at a label boundary of the
+        # host and match against host + path only, so a query string or fragment can't fake one.
+        self.verify_url_patterns: List[Pattern] = [
+            re.compile(rf"(?:[a-z0-9-]+\.)*(?:{p}).*", re.IGNORECASE)
+            for p in entry.get("verify_url_patterns") or []
+        ]
+
+    @property
+    def domain(self) -> Optional[str]:
+        return self.domains[0] if self.domains else None
+
+    def as_dict(self) -> Dict[str, str]:
+        """The `{"name", "domain"}` shape used in job payloads."""
+        return {"name": self.name, "domain": self.domain}
+
+    def owns_host(self, host: str) -> bool:
+        """True if `host` is one of the issuer's domains or a subdomain of one."""
+        host = host.lower().rstrip(".")
+        return any(host == domain or host.endswith(f".{domain}") for domain in self.domains)
+
+    def is_verification_url(self, url: str) -> bool:
+        """True if the URL's host belongs to the issuer and its host + path match a verification pattern."""
+        parsed = urlparse(url if "://" in url else f"http://{url}")
+        host = parsed.hostname or ""
+        if not self.owns_host(host):
+            return False
+        target = f"{host}{parsed.path}"
+        return any(pattern.fullmatch(target) for pattern in self.verify_url_patterns)
+
+
+class _Automaton:
+    """
+    Aho-Corasick automaton over normalized aliases. Patterns are stored as
+    " alias " (space-padded) and matched against `normalize_text()` output,
+    so a match can only start and end on a word boundary: "aws" will match
+    "AWS Certified" but never "laws" or "draws".
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+    def add(self, pattern: str, value: int) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(value)
+
+    def build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> List[int]:
+        """Returns the values of every pattern found, in order of where each match ends."""
+        found: List[int] = []
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+class IssuerRegistry:
+    """Compiled issuer registry. Build with `IssuerRegistry.from_entries()` or `load_registry()`."""
+
+    def __init__(self, issuers: List[Issuer]):
+        self.issuers = issuers
+        self._automaton = _Automaton()
+        self._by_domain: Dict[str, int] = {}
+        for index, issuer in enumerate(issuers):
+            # Domains are matched in the text too ("coursera.org" -> " coursera org ").
+            for alias in [*issuer.aliases, *issuer.domains]:
+                normalized = normalize_text(alias)
+                if normalized.strip():
+                    self._automaton.add(normalized, index)
+            for domain in issuer.domains:
+                self._by_domain.setdefault(domain, index)
+        self._automaton.build()
+
+    @classmethod
+    def from_entries(cls, entries: List[Dict[str, Any]]) -> "IssuerRegistry":
+        return cls([Issuer(entry) for entry in entries])
+
+    def __len__(self) -> int:
+        return len(self.issuers)
+
+    def issuer_for_url(self, url: str) -> Optional[Issuer]:
+        """Returns the issuer owning a URL's host (or any parent domain of it)."""
+        host = (urlparse(url if "://" in url else f"http://{url}").hostname or "").lower()
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            index = self._by_domain.get(".".join(labels[i:]))
+            if index is not None:
+                return self.issuers[index]
+        return None
+
+    def match_text(self, text: str) -> List[Issuer]:
+        """Returns every issuer mentioned in the text, in the order they appear."""
+        seen: Dict[int, None] = {}
+        for index in self._automaton.search(normalize_text(text)):
+            seen.setdefault(index, None)
+        return [self.issuers[index] for index in seen]
+
+    def detect(self, text: str, urls: List[str]) -> Optional[Issuer]:
+        """Finds the issuer of a certificate: URL hosts first (strongest signal), then the text."""
+        for url in urls:
+            issuer = self.issuer_for_url(url)
+            if issuer:
+                return issuer
+        matches = self.match_text(text)
+        return matches[0] if matches else None
+
+
+_registry: Optional[IssuerRegistry] = None
+
+
+def load_registry(path: Optional[str] = None) -> IssuerRegistry:
+    """
+    Loads and compiles the registry from `path` (default `ISSUER_REGISTRY_PATH`,
+    or the bundled `app/data/issuers.json`) and makes it the active registry.
+    """
+    global _registry
+    path = path or settings.ISSUER_REGISTRY_PATH or DEFAULT_REGISTRY_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    registry = IssuerRegistry.from_entries(data["issuers"] if isinstance(data, dict) else data)
+    _registry = registry
+    print(f"✅ Issuer registry loaded: {len(registry)} issuers from {path}")
+    return registry
+
+
+def get_registry() -> IssuerRegistry:
+    """Returns the active registry, loading it on first use (e.g. in CPU-pool workers and scripts)."""
+    if _registry is None:
+        return load_registry()
+    return _registry
@@ -0,0 +1,448 @@
+# File: app/services/job_store.py
+
+"""
+Durable Job Store
+
+Author: Mandar K.
+Date: 2025-09-20
+
+This module persists verification jobs in a local SQLite database (WAL mode)
+so that queued and in-flight work survives restarts and deploys, and so that
+any worker process sharing the database can answer status queries.
+
+Indexed lifecycle fields (`status`, `createdAt`, ...) live in their own
+columns; everything else about a job is stored as a JSON document.
+
+A job is run only by the worker process that claims it. `claim_job()` takes
+a lease (`worker`, `leaseUntil`) in one conditional UPDATE, and the holder
+renews it while the job runs. A job whose holder died becomes claimable again
+once its lease expires.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+# Fields stored as real columns. Everything else goes into the JSON `data` column.
+_COLUMNS = ("status", "createdAt", "startedAt", "finishedAt", "batchId", "raw_bytes", "worker", "leaseUntil")
+
+# Identifies this process in job leases.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    jobId      TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    createdAt  TEXT NOT NULL,
+    startedAt  TEXT,
+    finishedAt TEXT,
+    batchId    TEXT,
+    worker     TEXT,
+    leaseUntil REAL,
+    data       TEXT NOT NULL DEFAULT '{}',
+    raw_bytes  BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (createdAt);
+
+-- Encrypted blobs (keyed by content hash) and the jobs that reference them
+CREATE TABLE IF NOT EXISTS blobs (
+    blobKey    TEXT PRIMARY KEY,
+    lastRefAt  REAL NOT NULL,
+    deletingAt REAL            -- Tombstone: set while the GC deletes the data
+);
+CREATE TABLE IF NOT EXISTS blob_refs (
+    blobKey TEXT NOT NULL,
+    jobId   TEXT NOT NULL,
+    PRIMARY KEY (blobKey, jobId)
+);
+CREATE INDEX IF NOT EXISTS idx_blob_refs_job ON blob_refs (jobId);
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+
+
+def init_store(db_path: Optional[str] = None) -> None:
+    """
+    Opens (and if needed creates) the SQLite job database.
+
+    Safe to call more than once; subsequent calls are no-ops.
+
+    Args:
+        db_path: Optional override for `settings.JOB_DB_PATH`.
+    """
+    global _conn
+    with _lock:
+        if _conn is not None:
+            return
+        path = db_path or settings.JOB_DB_PATH
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={settings.JOB_DB_BUSY_TIMEOUT_MS}")
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        _conn = conn
+        print(f"✅ Job store ready at {path}")
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Brings databases created by older versions up to the current schema."""
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if "batchId" not in existing:
+        conn.execute("ALTER TABLE jobs ADD COLUMN batchId TEXT")
+    if "worker" not in existing:
+        conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+    if "leaseUntil" not in existing:
+        conn.execute("ALTER TABLE jobs ADD COLUMN leaseUntil REAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batchId)")
+    if "deletingAt" not in {row["name"] for row in conn.execute("PRAGMA table_info(blobs)")}:
+        conn.execute("ALTER TABLE blobs ADD COLUMN deletingAt REAL")
+
+
+def close_store() -> None:
+    """Closes the database connection, if open."""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def _db() -> sqlite3.Connection:
+    if _conn is None:
+        init_store()
+    return _conn
+
+
+def _row_to_job(row: sqlite3.Row, include_payload: bool) -> Dict[str, Any]:
+    job: Dict[str, Any] = json.loads(row["data"] or "{}")
+    job.update({
+        "jobId": row["jobId"],
+        "status": row["status"],
+        "createdAt": row["createdAt"],
+        "startedAt": row["startedAt"],
+        "finishedAt": row["finishedAt"],
+    })
+    if row["batchId"]:
+        job["batchId"] = row["batchId"]
+    if include_payload:
+        job["raw_bytes"] = row["raw_bytes"]
+    return job
+
+
+def _split_fields(fields: Dict[str, Any]):
+    columns = {k: v for k, v in fields.items() if k in _COLUMNS}
+    data = {k: v for k, v in fields.items() if k not in _COLUMNS and k != "jobId"}
+    return columns, data
+
+
+def create_job(job: Dict[str, Any]) -> None:
+    """
+    Inserts a new job. `jobId`, `status` and `createdAt` are required.
+
+    Args:
+        job: The full job dictionary, as built by the `/verify` endpoint.
+    """
+    create_jobs([job])
+
+
+def create_jobs(new_jobs: List[Dict[str, Any]]) -> None:
+    """Inserts several new jobs in a single transaction (used for batch submissions)."""
+    rows = []
+    for job in new_jobs:
+        columns, data = _split_fields(job)
+        rows.append((
+            job["jobId"],
+            columns.get("status", "queued"),
+            columns["createdAt"],
+            columns.get("startedAt"),
+            columns.get("finishedAt"),
+            columns.get("batchId"),
+            json.dumps(data, default=str),
+            columns.get("raw_bytes"),
+        ))
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT INTO jobs (jobId, status, createdAt, startedAt, finishedAt, batchId, data, raw_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def get_job(job_id: str, include_payload: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Loads a job by id.
+
+    Args:
+        job_id: The unique identifier for the job.
+        include_payload: Whether to load the (potentially large) uploaded file bytes.
+
+    Returns:
+        The job dictionary, or None if it does not exist.
+    """
+    cols = "jobId, status, createdAt, startedAt, finishedAt, batchId, data"
+    if include_payload:
+        cols += ", raw_bytes"
+    with _lock:
+        row = _db().execute(f"SELECT {cols} FROM jobs WHERE jobId = ?", (job_id,)).fetchone()
+    return _row_to_job(row, include_payload) if row else None
+
+
+def update_job(job_id: str, **fields: Any) -> None:
+    """
+    Updates a job in place. Column fields are written directly; all other
+    fields are merged into the job's JSON document.
+    """
+    columns, data = _split_fields(fields)
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if data:
+                row = db.execute("SELECT data FROM jobs WHERE jobId = ?", (job_id,)).fetchone()
+                if row is None:
+                    db.execute("ROLLBACK")
+                    return
+                merged = json.loads(row["data"] or "{}")
+                merged.update(data)
+                columns["data"] = json.dumps(merged, default=str)
+            if columns:
+                assignments = ", ".join(f"{name} = ?" for name in columns)
+                db.execute(
+                    f"UPDATE jobs SET {assignments} WHERE jobId = ?",
+                    (*columns.values(), job_id),
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def claim_job(job_id: str, lease_seconds: float, started_at: str) -> bool:
+    """
+    Atomically claims a job for this process. A job can be claimed if it is
+    queued, or if it is processing under a lease that has expired, and it is
+    not deferred past `started_at` (its `retryAt`).
+
+    Args:
+        job_id: The job to claim.
+        lease_seconds: How long the claim lasts unless renewed.
+        started_at: The current UTC time, ISO formatted (recorded as `startedAt`).
+
+    Returns:
+        True if this process now holds the job's lease.
+    """
+    now = time.time()
+    with _lock:
+        cursor = _db().execute(
+            "UPDATE jobs SET status = 'processing', worker = ?, leaseUntil = ?, startedAt = ? "
+            "WHERE jobId = ? AND (status = 'queued' "
+            "OR (status = 'processing' AND (leaseUntil IS NULL OR leaseUntil < ?))) "
+            "AND COALESCE(json_extract(data, '$.retryAt') <= ?, 1)",
+            (WORKER_ID, now + lease_seconds, started_at, job_id, now, started_at),
+        )
+    return cursor.rowcount == 1
+
+
+def renew_lease(job_id: str, lease_seconds: float) -> bool:
+    """
+    Extends this process's lease on a job.
+
+    Returns:
+        False if the job is no longer processing under this process's lease.
+    """
+    with _lock:
+        cursor = _db().execute(
+            "UPDATE jobs SET leaseUntil = ? WHERE jobId = ? AND status = 'processing' AND worker = ?",
+            (time.time() + lease_seconds, job_id, WORKER_ID),
+        )
+    return cursor.rowcount == 1
+
+
+def release_job(job_id: str) -> None:
+    """Returns a job this process holds to `queued` (e.g. when shutting down mid-job)."""
+    with _lock:
+        _db().execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, leaseUntil = NULL, startedAt = NULL "
+            "WHERE jobId = ? AND status = 'processing' AND worker = ?",
+            (job_id, WORKER_ID),
+        )
+
+
+def requeue_expired_jobs() -> List[str]:
+    """
+    Puts jobs whose worker stopped renewing its lease back to `queued`.
+
+    Returns:
+        The ids of the re-queued jobs, oldest first.
+    """
+    expired = "status = 'processing' AND (leaseUntil IS NULL OR leaseUntil < ?)"
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(f"SELECT jobId FROM jobs WHERE {expired} ORDER BY createdAt", (now,)).fetchall()
+            db.execute(
+                f"UPDATE jobs SET status = 'queued', worker = NULL, leaseUntil = NULL, startedAt = NULL WHERE {expired}",
+                (now,),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return [row["jobId"] for row in rows]
+
+
+def purge_finished_jobs(finished_before: str) -> int:
+    """
+    Deletes finished jobs (any state other than queued/processing) older than
+    the given ISO timestamp, together with their blob references.
+
+    Returns:
+        The number of jobs deleted.
+    """
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            stale = "status NOT IN ('queued', 'processing') AND COALESCE(finishedAt, createdAt) < ?"
+            db.execute(
+                f"DELETE FROM blob_refs WHERE jobId IN (SELECT jobId FROM jobs WHERE {stale})",
+                (finished_before,),
+            )
+            deleted = db.execute(f"DELETE FROM jobs WHERE {stale}", (finished_before,)).rowcount
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return deleted
+
+
+def add_blob_ref(blob_key: str, job_id: str) -> bool:
+    """
+    Records that a job references a blob (registering the blob if it is new).
+
+    Returns:
+        False if the blob is tombstoned: the GC is deleting its data, so the
+        caller must wait for `forget_blob()` and then call again to upload it
+        afresh. A tombstone older than `BLOB_GC_DELETE_TIMEOUT_SECONDS` is
+        assumed abandoned and cleared. True otherwise.
+    """
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT INTO blobs (blobKey, lastRefAt) VALUES (?, ?) "
+                "ON CONFLICT (blobKey) DO UPDATE SET lastRefAt = excluded.lastRefAt",
+                (blob_key, now),
+            )
+            db.execute("INSERT OR IGNORE INTO blob_refs (blobKey, jobId) VALUES (?, ?)", (blob_key, job_id))
+            db.execute(
+                "UPDATE blobs SET deletingAt = NULL WHERE blobKey = ? AND deletingAt < ?",
+                (blob_key, now - settings.BLOB_GC_DELETE_TIMEOUT_SECONDS),
+            )
+            deleting_at = db.execute("SELECT deletingAt FROM blobs WHERE blobKey = ?", (blob_key,)).fetchone()[0]
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return deleting_at is None
+
+
+_UNREFERENCED = "NOT EXISTS (SELECT 1 FROM blob_refs r WHERE r.blobKey = blobs.blobKey)"
+
+
+def find_unreferenced_blobs(referenced_before: float) -> List[str]:
+    """
+    Returns keys of blobs with no job references, last referenced before the
+    given epoch time. Blobs being deleted are skipped unless their tombstone
+    was abandoned.
+    """
+    stale = time.time() - settings.BLOB_GC_DELETE_TIMEOUT_SECONDS
+    with _lock:
+        rows = _db().execute(
+            f"SELECT blobKey FROM blobs WHERE lastRefAt < ? AND (deletingAt IS NULL OR deletingAt < ?) "
+            f"AND {_UNREFERENCED}",
+            (referenced_before, stale),
+        ).fetchall()
+    return [row["blobKey"] for row in rows]
+
+
+def tombstone_blob(blob_key: str) -> Optional[float]:
+    """
+    Marks an unreferenced blob as being deleted, re-checking its references in
+    the same statement. From then on `add_blob_ref()` reports it as unusable
+    until `forget_blob()` or `restore_blob()` is called, so the data can be
+    deleted outside any lock.
+
+    Returns:
+        The tombstone's timestamp (pass it on to `forget_blob()` / `restore_blob()`),
+        or None if the blob is referenced again or already being deleted.
+    """
+    now = time.time()
+    with _lock:
+        marked = _db().execute(
+            f"UPDATE blobs SET deletingAt = ? WHERE blobKey = ? "
+            f"AND (deletingAt IS NULL OR deletingAt < ?) AND {_UNREFERENCED}",
+            (now, blob_key, now - settings.BLOB_GC_DELETE_TIMEOUT_SECONDS),
+        ).rowcount
+    return now if marked else None
+
+
+def forget_blob(blob_key: str, tombstone: float) -> None:
+    """Drops a tombstoned blob's record once its data is deleted. Jobs waiting on it then upload afresh."""
+    with _lock:
+        _db().execute("DELETE FROM blobs WHERE blobKey = ? AND deletingAt = ?", (blob_key, tombstone))
+
+
+def restore_blob(blob_key: str, tombstone: float) -> None:
+    """Clears a tombstone after a failed delete, so the blob is usable again."""
+    with _lock:
+        _db().execute("UPDATE blobs SET deletingAt = NULL WHERE blobKey = ? AND deletingAt = ?", (blob_key, tombstone))
+
+
+def find_jobs_by_batch(batch_id: str) -> List[Dict[str, Any]]:
+    """Returns all jobs submitted in a batch, in submission order."""
+    with _lock:
+        rows = _db().execute(
+            "SELECT jobId, status, createdAt, startedAt, finishedAt, batchId, data "
+            "FROM jobs WHERE batchId = ? ORDER BY createdAt, rowid",
+            (batch_id,),
+        ).fetchall()
+    return [_row_to_job(row, include_payload=False) for row in rows]
+
+
+def find_job_ids_by_status(statuses: Iterable[str]) -> List[str]:
+    """Returns the ids of all jobs in any of the given states, oldest first."""
+    statuses = list(statuses)
+    if not statuses:
+        return []
+    placeholders = ", ".join("?" for _ in statuses)
+    with _lock:
+        rows = _db().execute(
+            f"SELECT jobId FROM jobs WHERE status IN ({placeholders}) ORDER BY createdAt",
+            statuses,
+        ).fetchall()
+    return [row["jobId"] for row in rows]
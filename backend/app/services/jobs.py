@@ -230,43 +230,234 @@ Background Job Service
 
 Author: Mandar K.
 Date: 2024-10-10
-Updated: 2025-09-15
+Updated: 2025-09-20
 
 This module manages the state of processing jobs, including the main
 background task that orchestrates the entire certificate verification flow
 using Hugging Face AI models.
 """
 
-from datetime import datetime
-from typing import Dict, Any, Optional
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 import json
+import os
 
 from app.core.config import settings
 from app.utils import security
+from app.utils.cache import PersistentCache
+from app.services import blob_store
 from app.services import certificate_processing as cert_proc
+from app.services import cpu_pool
 from app.services import huggingface as hf_service
+from app.services import job_store
+from app.services import ocr
+from app.services import rules
+from app.services import uploads
 from app.services import verification # For posting back the result
+from app.services.resilience import UpstreamUnavailableError
+from app.services.scheduler import JobScheduler
+
+_lease_sweep_task: Optional[asyncio.Task] = None
+
+# Verdicts for previously seen uploads, keyed by file SHA-256 and student name.
+result_cache = PersistentCache(
+    settings.CACHE_DB_PATH, "verification_results",
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+)
+
+# Terminal job states; a batch is complete when every job is in one of these.
+FINISHED_STATUSES = ("done", "failed", "forward_failed", "rejected")
+
+def create_job(job_data: Dict[str, Any]) -> None:
+    """Persists a newly accepted job in the durable job store."""
+    job_store.create_job(job_data)
 
-# In-memory store for jobs.
-JOBS: Dict[str, Dict[str, Any]] = {}
+def create_jobs(job_datas: List[Dict[str, Any]]) -> None:
+    """Persists the jobs of a batch submission in one transaction."""
+    job_store.create_jobs(job_datas)
 
 def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
     """Retrieves the sanitized status of a specific job."""
-    job = JOBS.get(job_id)
+    job = job_store.get_job(job_id)
     if not job:
         return None
+    return _public_view(job)
+
+def _public_view(job: Dict[str, Any]) -> Dict[str, Any]:
     return {
         key: job.get(key) for key in
-        ["jobId", "status", "createdAt", "startedAt", "finishedAt", "result", "error"]
+        ["jobId", "status", "createdAt", "startedAt", "finishedAt", "cache", "result", "error"]
+    }
+
+def get_batch_status(batch_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Aggregates the progress of every job in a batch.
+
+    Returns:
+        Per-status counts, overall progress and each job's sanitized status,
+        or None if no such batch exists.
+    """
+    batch_jobs = job_store.find_jobs_by_batch(batch_id)
+    if not batch_jobs:
+        return None
+    counts: Dict[str, int] = {}
+    for job in batch_jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+    return {
+        "batchId": batch_id,
+        "total": len(batch_jobs),
+        "finished": finished,
+        "progress": round(finished / len(batch_jobs), 4),
+        "status": "done" if finished == len(batch_jobs) else "processing",
+        "counts": counts,
+        "jobs": [_public_view(job) for job in batch_jobs],
     }
 
+def recover_pending_jobs() -> List[str]:
+    """
+    Finds jobs left unfinished by a previous process: queued jobs, and
+    processing jobs whose lease has expired (those are reset to `queued`).
+    Jobs another live process is running keep their lease and are left alone.
+
+    Returns:
+        The ids of the recovered jobs, oldest first, ready to be re-enqueued.
+        Another process may enqueue the same jobs; `claim_job()` lets only one run each.
+    """
+    job_store.requeue_expired_jobs()
+    return job_store.find_job_ids_by_status(["queued"])
+
+async def _lease_sweep_loop() -> None:
+    # Picks up jobs from a process that died mid-job without a restart of this one.
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS)
+        try:
+            job_ids = job_store.requeue_expired_jobs()
+        except Exception as e:
+            print(f"❌ Lease sweep failed: {e}")
+            continue
+        if job_ids:
+            print(f"♻️ Re-enqueueing {len(job_ids)} job(s) whose worker lease expired.")
+            scheduler.enqueue_in_background(job_ids)
+
+def start_lease_sweeper() -> None:
+    """Starts the periodic expired-lease sweep. Must run inside the event loop."""
+    global _lease_sweep_task
+    if _lease_sweep_task is None:
+        _lease_sweep_task = asyncio.create_task(_lease_sweep_loop(), name="job-lease-sweep")
+
+async def stop_lease_sweeper() -> None:
+    global _lease_sweep_task
+    if _lease_sweep_task is not None:
+        _lease_sweep_task.cancel()
+        await asyncio.gather(_lease_sweep_task, return_exceptions=True)
+        _lease_sweep_task = None
+
+def _fail(job_id: str, error: str) -> None:
+    """Marks a job as failed and releases its stored upload."""
+    job_store.update_job(
+        job_id, status="failed", error=error,
+        finishedAt=datetime.utcnow().isoformat(), raw_bytes=None
+    )
+    uploads.discard(uploads.spool_path_for(job_id))
+
+def _upload_path(job: Dict[str, Any]) -> Optional[str]:
+    """Returns the job's spooled upload on disk, spooling legacy in-database bytes if needed."""
+    path = job.get("spool_path")
+    if path and os.path.exists(path):
+        return path
+    if job.get("raw_bytes"):
+        # Jobs accepted before uploads were spooled kept their bytes in the job store.
+        path = uploads.spool_path_for(job["jobId"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(job["raw_bytes"])
+        return path
+    return None
+
+def _result_cache_key(blob_hash: str, student_name: str) -> str:
+    """Builds the result-cache key: the same file verified for the same student."""
+    normalized_name = " ".join(student_name.lower().split())
+    return f"{blob_hash}:{normalized_name}"
+
+async def run_job(job_id: str):
+    """
+    Scheduler entry point: claims the job's lease, runs it while renewing the
+    lease, and records unexpected crashes as failures. Jobs already finished
+    or leased by another worker process are skipped.
+    """
+    if not job_store.claim_job(job_id, settings.JOB_LEASE_SECONDS, datetime.utcnow().isoformat()):
+        delay = _seconds_until_retry(job_store.get_job(job_id))
+        if delay:
+            # Deferred (e.g. recovered after a restart): wait until the upstream said to retry.
+            print(f"⏳ Job {job_id} is deferred; re-queueing it in {delay:.0f}s.")
+            scheduler.enqueue_in_background([job_id], delay_seconds=delay)
+            return
+        print(f"⏭️ Job {job_id} is finished or held by another worker; skipping.")
+        return
+    keeper = asyncio.create_task(_keep_lease(job_id))
+    try:
+        await process_and_forward(job_id)
+    except UpstreamUnavailableError as e:
+        _defer(job_id, e)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back now rather than when the lease runs out.
+        job_store.release_job(job_id)
+        raise
+    except Exception as e:
+        print(f"❌ Job {job_id} crashed: {e}")
+        _fail(job_id, f"Unexpected error during processing: {e}")
+    finally:
+        keeper.cancel()
+
+def _seconds_until_retry(job: Optional[Dict[str, Any]]) -> Optional[float]:
+    """How long until a queued, deferred job may run, or None if it is not waiting on `retryAt`."""
+    if not job or job.get("status") != "queued" or not job.get("retryAt"):
+        return None
+    try:
+        remaining = (datetime.fromisoformat(job["retryAt"]) - datetime.utcnow()).total_seconds()
+    except ValueError:
+        return None
+    return remaining if remaining > 0 else None
+
+async def _keep_lease(job_id: str) -> None:
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        if not job_store.renew_lease(job_id, settings.JOB_LEASE_SECONDS):
+            print(f"⚠️ Job {job_id}: lost its lease.")
+            return
+
+def _defer(job_id: str, error: UpstreamUnavailableError) -> None:
+    """
+    Puts a job back in the queue for when the upstream should be available
+    again (e.g. a Hugging Face model that is still loading), instead of
+    failing it or holding a worker while it waits.
+    """
+    job = job_store.get_job(job_id) or {}
+    deferrals = int(job.get("deferrals") or 0) + 1
+    if deferrals > settings.HF_MAX_DEFERRALS:
+        _fail(job_id, f"Upstream unavailable after {settings.HF_MAX_DEFERRALS} retries: {error}")
+        return
+    delay = max(1.0, error.retry_after)
+    retry_at = datetime.utcnow() + timedelta(seconds=delay)
+    job_store.update_job(
+        job_id, status="queued", startedAt=None, worker=None, leaseUntil=None, deferrals=deferrals,
+        retryAt=retry_at.isoformat(), lastError=str(error),
+    )
+    print(f"⏳ Job {job_id} deferred for {delay:.0f}s ({error}); attempt {deferrals}/{settings.HF_MAX_DEFERRALS}.")
+    scheduler.enqueue_in_background([job_id], delay_seconds=delay)
+
 async def process_and_forward(job_id: str):
     """The main background task for processing a certificate using AI."""
-    job = JOBS[job_id]
-    job["status"] = "processing"
-    job["startedAt"] = datetime.utcnow().isoformat()
+    job = job_store.get_job(job_id, include_payload=True)
+    if not job:
+        print(f"❌ Job {job_id} not found in the job store.")
+        return
 
-    file_bytes = job.get("raw_bytes")
+    upload_path = _upload_path(job)
+    job.pop("raw_bytes", None)
     content_type = job.get("content_type")
 
     # --- Metadata Handling ---
@@ -279,45 +470,42 @@ async def process_and_forward(job_id: str):
             raise ValueError("'studentId' and 'providedName' are required in metadata.")
         print(f"✅ Starting job {job_id} for studentId: {student_id_from_metadata}")
     except (json.JSONDecodeError, ValueError) as e:
-        job["status"] = "failed"; job["error"] = f"Fatal: Invalid metadata. {e}"
+        _fail(job_id, f"Fatal: Invalid metadata. {e}")
         return
 
-    # --- Step 1: Prepare Image and Scan QR ---
-    certificate_image = cert_proc.get_image_from_bytes(file_bytes, content_type)
-    if not certificate_image:
-        job["status"] = "failed"; job["error"] = "Could not process the uploaded file into an image."
-        return
-        
-    qr_urls = cert_proc.scan_qr_from_image(certificate_image)
-    qr_url = qr_urls[0] if qr_urls else None
-
-    # --- Step 2: Extract Text using Hugging Face AI ---
-    extracted_text = await hf_service.extract_text_from_image(certificate_image)
-    if not extracted_text:
-        job["status"] = "failed"; job["error"] = "AI failed to extract text from the certificate image."
+    if not upload_path:
+        _fail(job_id, "The uploaded file is no longer available.")
         return
 
-    # --- Step 3: Get AI Verification ---
-    ai_analysis = await hf_service.get_ai_verification(
-        text=extracted_text,
-        qr_url=qr_url,
-        student_name=student_name_for_validation
-    )
-
-    # --- Step 4: Determine Final Status from AI Analysis ---
-    if ai_analysis.get("is_valid"):
-        status_result = "valid"
-    elif ai_analysis.get("confidence_score", 0.0) >= 0.5:
-        status_result = "suspicious"
+    # --- Step 1: Reuse the verdict of an identical earlier upload, if any ---
+    blob_hash = job.get("blob_hash_sha256")
+    if not blob_hash:
+        with uploads.open_mapped(upload_path) as file_view:
+            blob_hash = security.sha256_hex(file_view)
+    cache_key = _result_cache_key(blob_hash, student_name_for_validation)
+    cached = result_cache.get(cache_key)
+    if cached:
+        cache_status = "hit"
+        extracted = cached["extracted"]
+        # Served now, but reached earlier: refresh checkedAt and keep the original time.
+        verdict = {
+            **cached["verification"],
+            "checkedAt": datetime.utcnow().isoformat(),
+            "originalCheckedAt": cached["verification"].get("checkedAt"),
+        }
+        print(f"⚡ Job {job_id} served from the result cache.")
     else:
-        status_result = "invalid"
-
-    # --- Step 5: Encrypt, Hash, and Prepare Payload ---
-    blob_hash = security.sha256_hex(file_bytes)
-    encrypted_data = security.encrypt_aes_gcm(file_bytes)
-    save_path = cert_proc.save_encrypted_blob_file(
-        job_id, encrypted_data["nonce_b64"], encrypted_data["ciphertext_b64"], job.get("filename")
-    )
+        cache_status = "miss"
+        analysis = await _analyze_certificate(job_id, upload_path, content_type, student_name_for_validation)
+        if analysis is None:
+            return
+        extracted, verdict, cacheable = analysis
+        if cacheable:
+            result_cache.set(cache_key, {"extracted": extracted, "verification": verdict})
+        verdict = {**verdict, "originalCheckedAt": verdict["checkedAt"]}
+
+    # --- Step 5: Store the encrypted upload (deduplicated by content hash) and Prepare Payload ---
+    save_path = await blob_store.store_upload(job_id, blob_hash, upload_path)
     
     payload = {
         "jobId": job_id,
@@ -325,27 +513,165 @@ async def process_and_forward(job_id: str):
         "filename": job.get("filename"),
         "contentType": content_type,
         "source": job.get("source"),
-        "extracted": {
-            "text_snippet": (extracted_text or "")[:500],
-            "issuer": {"name": ai_analysis.get("issuer")},
-            "qr_urls": qr_urls,
-        },
-        "verification": {
-            "status": status_result,
-            "confidence": ai_analysis.get("confidence_score"),
-            "ai_analysis": ai_analysis, # Include the full AI reasoning
-            "checkedAt": datetime.utcnow().isoformat()
-        },
+        "extracted": extracted,
+        "verification": {**verdict, "cache": cache_status, "cached": cache_status == "hit"},
         "encrypted_blob_path": save_path,
         "blob_hash_sha256": blob_hash,
     }
 
     # --- Step 6: Forward to Downstream Server ---
+    # Only the lease holder posts; if the lease expired and another worker took over, it will post instead.
+    if not job_store.renew_lease(job_id, settings.JOB_LEASE_SECONDS):
+        print(f"⚠️ Job {job_id}: lease lost to another worker; not forwarding.")
+        return
     print(f"Forwarding final payload for job {job_id} to {settings.SERVER_ENDPOINT}")
     post_resp = await verification.post_to_server(payload)
     
-    job["status"] = "done" if post_resp.get("ok") else "forward_failed"
-    job["result"] = post_resp
-    job["finishedAt"] = datetime.utcnow().isoformat()
-    print(f"✅ Job {job_id} finished with status: {job['status']}")
+    final_status = "done" if post_resp.get("ok") else "forward_failed"
+    job_store.update_job(
+        job_id, status=final_status, result=post_resp, cache=cache_status,
+        finishedAt=datetime.utcnow().isoformat(), raw_bytes=None
+    )
+    uploads.discard(upload_path)
+    print(f"✅ Job {job_id} finished with status: {final_status}")
+
+async def _scan_pages(
+    upload_path: str, content_type: Optional[str], student_name: str, need_text: bool, known_text: str
+) -> List[Dict[str, Any]]:
+    """
+    Rasterizes and QR-scans the leading pages (up to `PDF_MAX_PAGES`) in parallel
+    across the CPU pool, and OCRs them too if `need_text` is set.
+
+    Stops as soon as the pages finished so far hold both a QR code and the
+    student's name; pages still being processed are cancelled.
+
+    Returns:
+        Per-page results, in page order.
+    """
+    page_count = await cpu_pool.run(cert_proc.count_pages, upload_path, content_type)
+
+    async def scan(page_number: int) -> Dict[str, Any]:
+        image, page_qr_urls = await cpu_pool.run(
+            cert_proc.rasterize_and_scan_page, upload_path, content_type, page_number
+        )
+        # Local Tesseract and/or Hugging Face, per OCR_POLICY
+        page_ocr = await ocr.extract_text(image) if image is not None and need_text else None
+        return {"page": page_number, "rendered": image is not None, "qr_urls": page_qr_urls, "ocr": page_ocr}
+
+    tasks = [asyncio.create_task(scan(page_number)) for page_number in range(1, page_count + 1)]
+    pages: List[Dict[str, Any]] = []
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            pages.append(await next_page)
+            text = " ".join([known_text] + [page["ocr"].text for page in pages if page["ocr"]])
+            if any(page["qr_urls"] for page in pages) and cert_proc.name_matches_authenticated(student_name, text):
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if len(pages) < page_count:
+        print(f"✅ Found a QR code and the student's name after {len(pages)} of {page_count} page(s); stopped early.")
+    return sorted(pages, key=lambda page: page["page"])
+
+def _merge_page_text(pages: List[Dict[str, Any]]) -> Optional[ocr.OcrResult]:
+    """Combines per-page OCR results into one, in page order."""
+    results = [page["ocr"] for page in pages if page["ocr"] and page["ocr"].text]
+    if not results:
+        return None
+    confidences = [result.confidence for result in results if result.confidence is not None]
+    return ocr.OcrResult(
+        "\n\n".join(result.text for result in results),
+        "+".join(dict.fromkeys(result.engine for result in results)),
+        min(confidences) if confidences else None,
+    )
+
+async def _analyze_certificate(
+    job_id: str, upload_path: str, content_type: Optional[str], student_name: str
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], bool]]:
+    """
+    Runs the extraction and AI verification stages for a certificate.
+
+    Returns:
+        A tuple of (extracted data, verification verdict, whether the verdict
+        may be cached), or None if the job failed (the failure is recorded).
+    """
+    # --- Step 2: Text-layer fast path for born-digital PDFs (no rasterization, no OCR) ---
+    ocr_result: Optional[ocr.OcrResult] = None
+    qr_urls: List[str] = []
+    if cert_proc.is_pdf(content_type):
+        layer_text, layer_urls = await cpu_pool.run(cert_proc.extract_pdf_text_layer, upload_path)
+        if cert_proc.has_usable_text(layer_text):
+            print(f"✅ Job {job_id}: using the PDF text layer; skipping OCR.")
+            ocr_result = ocr.OcrResult(layer_text, "pdf_text_layer", None)
+            qr_urls = cert_proc.pick_verification_links(layer_urls)
+
+    # --- Step 3: Rasterize pages only if OCR or the QR scan still needs pixels (in parallel, off the event loop) ---
+    pages: List[Dict[str, Any]] = []
+    if ocr_result is None or not qr_urls:
+        pages = await _scan_pages(
+            upload_path, content_type, student_name,
+            need_text=ocr_result is None, known_text=ocr_result.text if ocr_result else "",
+        )
+        if not any(page["rendered"] for page in pages) and ocr_result is None:
+            _fail(job_id, "Could not process the uploaded file into an image.")
+            return None
+        if not qr_urls:
+            qr_urls = list(dict.fromkeys(url for page in pages for url in page["qr_urls"]))
+        if ocr_result is None:
+            ocr_result = _merge_page_text(pages)
+            if not ocr_result:
+                _fail(job_id, "AI failed to extract text from the certificate image.")
+                return None
+    qr_url = qr_urls[0] if qr_urls else None
+    extracted_text = ocr_result.text
+
+    # --- Step 4: Settle clear-cut cases with deterministic rules; only ambiguous ones reach the LLM ---
+    ai_analysis = await rules.evaluate(extracted_text, qr_urls, student_name)
+    if ai_analysis is not None:
+        tier = rules.TIER_RULES
+        status_result = ai_analysis["status"]
+        print(f"✅ Job {job_id}: settled by the rules tier ({status_result}); skipping the LLM.")
+    else:
+        tier = rules.TIER_LLM
+        ai_analysis = await hf_service.get_ai_verification(
+            text=extracted_text,
+            qr_url=qr_url,
+            student_name=student_name
+        )
+
+        if ai_analysis.get("is_valid"):
+            status_result = "valid"
+        elif (ai_analysis.get("confidence_score") or 0.0) >= 0.5:
+            status_result = "suspicious"
+        else:
+            status_result = "invalid"
+
+    extracted = {
+        "text_snippet": (extracted_text or "")[:500],
+        "issuer": {"name": ai_analysis.get("issuer")},
+        "qr_urls": qr_urls,
+        "ocr": {"engine": ocr_result.engine, "confidence": ocr_result.confidence},
+        "pages": [
+            {
+                "page": page["page"],
+                "qr_urls": page["qr_urls"],
+                "ocr_engine": page["ocr"].engine if page["ocr"] else None,
+                "text_chars": len(page["ocr"].text) if page["ocr"] else 0,
+            }
+            for page in pages
+        ],
+    }
+    verdict = {
+        "status": status_result,
+        "confidence": ai_analysis.get("confidence_score"),
+        "tier": tier,  # "rules" or "llm": which tier decided
+        "ai_analysis": ai_analysis, # Include the full AI reasoning
+        "checkedAt": datetime.utcnow().isoformat()
+    }
+    # Only a verdict the model actually produced is worth reusing; error fallbacks are not.
+    cacheable = hf_service.is_well_formed_verdict(ai_analysis)
+    return extracted, verdict, cacheable
 
+# Bounded worker pool that runs jobs; started and stopped from the app lifespan.
+scheduler = JobScheduler(run_job, settings.WORKER_CONCURRENCY, settings.MAX_QUEUE_DEPTH)
@@ -0,0 +1,152 @@
+# File: app/services/ocr.py
+
+"""
+OCR Engines
+
+Author: Mandar K.
+Date: 2025-09-27
+
+This module puts text extraction behind a small `OcrEngine` interface with two
+implementations: a local Tesseract engine that runs in the CPU pool, and the
+remote Hugging Face TrOCR model. `extract_text()` applies `settings.OCR_POLICY`:
+
+  * `local`: Tesseract only.
+  * `remote`: Hugging Face only.
+  * `local_first`: Tesseract, falling back to Hugging Face when Tesseract is
+    unavailable, finds no text, or its confidence is below `OCR_MIN_CONFIDENCE`.
+"""
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.services import cpu_pool
+from app.services import huggingface as hf_service
+from app.services.resilience import UpstreamUnavailableError
+
+POLICIES = ("local", "remote", "local_first")
+
+
+class OcrResult(NamedTuple):
+    text: str
+    engine: str
+    confidence: Optional[float]  # 0.0 - 1.0; None when the engine does not report one
+
+
+class OcrEngine(ABC):
+    """A text recognizer for certificate images."""
+
+    name: str
+
+    @abstractmethod
+    async def recognize(self, pil_image: Image.Image) -> Optional[OcrResult]:
+        """Returns the recognized text, or None if recognition failed."""
+
+
+def tesseract_ocr(pil_image: Image.Image) -> Tuple[str, float]:
+    """
+    Runs Tesseract on an image. CPU-bound; runs in the CPU pool.
+
+    Returns:
+        A tuple of (text with the original line breaks, mean word confidence 0.0 - 1.0).
+    """
+    import pytesseract
+
+    # Set per call: this runs inside the CPU pool's worker processes.
+    if settings.TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
+
+    data = pytesseract.image_to_data(
+        pil_image.convert("L"), lang=settings.TESSERACT_LANG, output_type=pytesseract.Output.DICT
+    )
+    lines, confidences = {}, []
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < 0:
+            continue
+        line_key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(line_key, []).append(word)
+        confidences.append(confidence)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    mean_confidence = sum(confidences) / len(confidences) / 100.0 if confidences else 0.0
+    return text, mean_confidence
+
+
+class TesseractEngine(OcrEngine):
+    """Local Tesseract OCR, run in the CPU process pool."""
+
+    name = "tesseract"
+
+    def __init__(self):
+        self.available = True
+
+    async def recognize(self, pil_image: Image.Image) -> Optional[OcrResult]:
+        if not self.available:
+            return None
+        try:
+            text, confidence = await cpu_pool.run(tesseract_ocr, pil_image)
+        except Exception as e:
+            # pytesseract raises TesseractNotFoundError when the binary is missing; stop retrying it.
+            if type(e).__name__ == "TesseractNotFoundError":
+                self.available = False
+                print("⚠️ Tesseract is not installed; local OCR disabled.")
+            else:
+                print(f"❌ Tesseract OCR Error: {e}")
+            return None
+        print(f"✅ Tesseract extracted text (confidence {confidence:.2f}).")
+        return OcrResult(text, self.name, round(confidence, 4))
+
+
+class HuggingFaceEngine(OcrEngine):
+    """Remote OCR with the Hugging Face TrOCR model (cached, coalesced and batched)."""
+
+    name = "huggingface"
+
+    async def recognize(self, pil_image: Image.Image) -> Optional[OcrResult]:
+        text = await hf_service.extract_text_from_image(pil_image)
+        return OcrResult(text, self.name, None) if text else None
+
+
+local_engine = TesseractEngine()
+remote_engine = HuggingFaceEngine()
+
+
+async def extract_text(pil_image: Image.Image) -> Optional[OcrResult]:
+    """
+    Extracts text from a certificate image according to `settings.OCR_POLICY`.
+
+    Args:
+        pil_image: A PIL Image object of the certificate.
+
+    Returns:
+        The best available `OcrResult`, or None if every allowed engine failed.
+
+    Raises:
+        UpstreamUnavailableError: If Hugging Face is needed but is loading or its circuit is open.
+    """
+    policy = settings.OCR_POLICY
+    if policy not in POLICIES:
+        print(f"⚠️ Unknown OCR_POLICY {policy!r}; using 'remote'.")
+        policy = "remote"
+
+    if policy == "remote":
+        return await remote_engine.recognize(pil_image)
+
+    local_result = await local_engine.recognize(pil_image)
+    if policy == "local":
+        return local_result if local_result and local_result.text else None
+
+    if local_result and local_result.text and local_result.confidence >= settings.OCR_MIN_CONFIDENCE:
+        return local_result
+    try:
+        remote_result = await remote_engine.recognize(pil_image)
+    except UpstreamUnavailableError:
+        if local_result and local_result.text:
+            return local_result  # Don't defer the job over a second opinion
+        raise
+    if remote_result:
+        return remote_result
+    # Low-confidence local text still beats no text at all.
+    return local_result if local_result and local_result.text else None
@@ -0,0 +1,196 @@
+# File: app/services/resilience.py
+
+"""
+Upstream Resilience
+
+Author: Mandar K.
+Date: 2025-10-02
+
+Per-endpoint protection for calls to the Hugging Face Inference API:
+
+  * `CircuitBreaker`: opens after `HF_BREAKER_FAILURE_THRESHOLD` consecutive
+    failures and fails fast while open. After `HF_BREAKER_RESET_SECONDS` it
+    lets one probe call through (half-open). A 503 "model is loading" response
+    opens the breaker until the model's `estimated_time`.
+  * Adaptive timeouts: each breaker tracks recent latencies, and the request
+    timeout follows a high percentile of them, clamped to
+    [`HF_TIMEOUT_MIN_SECONDS`, `HF_TIMEOUT_MAX_SECONDS`].
+  * Hedging (optional, `HF_HEDGE_ENABLED`): if a call is slower than the
+    recent p95, a second identical call is started and the first to finish wins.
+
+When an endpoint is unavailable, callers get `UpstreamUnavailableError` with a
+`retry_after`, so jobs can be deferred instead of blocking a worker.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.core.config import settings
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when an upstream is known to be unavailable; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Raised without calling the upstream because its circuit breaker is open."""
+
+
+class ModelLoadingError(UpstreamUnavailableError):
+    """Raised when Hugging Face answers 503 while the model is loading (cold start)."""
+
+
+class CircuitBreaker:
+    """A consecutive-failure circuit breaker with a latency window for adaptive timeouts."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, window: int = 200):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.open_reason: Optional[str] = None
+        self._probe_in_flight = False
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self.counters = {"successes": 0, "failures": 0, "rejected": 0, "hedged": 0, "opened": 0}
+
+    # --- State ---
+    def before_call(self) -> None:
+        """
+        Admits a call or raises `CircuitOpenError`. While half-open, only one
+        probe call is admitted at a time.
+        """
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now < self.open_until:
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(
+                    f"{self.name} circuit is open ({self.open_reason}).", retry_after=self.open_until - now
+                )
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is half-open; probe in flight.", retry_after=1.0)
+            self._probe_in_flight = True
+
+    def record_success(self, latency: Optional[float]) -> None:
+        """Closes the circuit. `latency` joins the adaptive-timeout window unless it is None."""
+        if latency is not None:
+            self._latencies.append(latency)
+        self.counters["successes"] += 1
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            print(f"✅ {self.name} circuit closed again.")
+        self.state = self.CLOSED
+
+    def record_failure(self, reason: str) -> None:
+        self.counters["failures"] += 1
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.open_for(self.reset_seconds, reason)
+
+    def open_for(self, seconds: float, reason: str) -> None:
+        """Opens the circuit for `seconds` (e.g. until a loading model is expected to be ready)."""
+        self._probe_in_flight = False
+        if self.state != self.OPEN:
+            self.counters["opened"] += 1
+            print(f"⚠️ {self.name} circuit opened for {seconds:.0f}s: {reason}")
+        self.state = self.OPEN
+        self.open_reason = reason
+        self.open_until = max(self.open_until, time.monotonic() + seconds)
+
+    def release_probe(self) -> None:
+        """Frees the half-open probe slot for a call that ended without a verdict (e.g. a client error)."""
+        self._probe_in_flight = False
+
+    # --- Latency ---
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self._latencies) < 10:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))]
+
+    def timeout(self) -> float:
+        """The request timeout: a multiple of recent p99 latency, clamped to the configured range."""
+        p99 = self.percentile(99)
+        if p99 is None:
+            return settings.HF_TIMEOUT_MAX_SECONDS
+        adaptive = p99 * settings.HF_TIMEOUT_MULTIPLIER
+        return max(settings.HF_TIMEOUT_MIN_SECONDS, min(settings.HF_TIMEOUT_MAX_SECONDS, adaptive))
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None if hedging is off or there is too little data."""
+        if not settings.HF_HEDGE_ENABLED:
+            return None
+        return self.percentile(settings.HF_HEDGE_PERCENTILE)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "open_for_seconds": round(max(0.0, self.open_until - now), 1) if self.state == self.OPEN else 0.0,
+            "open_reason": self.open_reason if self.state != self.CLOSED else None,
+            "latency_p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "timeout_seconds": round(self.timeout(), 1),
+            **self.counters,
+        }
+
+
+async def hedged(breaker: CircuitBreaker, attempt: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Runs `attempt`, starting a second copy if the first is slower than the
+    breaker's hedge delay. Returns the first result; the other copy is cancelled.
+    """
+    delay = breaker.hedge_delay()
+    first = asyncio.ensure_future(attempt())
+    if delay is None:
+        return await first
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+    breaker.counters["hedged"] += 1
+    second = asyncio.ensure_future(attempt())
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # Both failed: surface the original call's error.
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Returns the shared breaker for an upstream endpoint, creating it on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name, settings.HF_BREAKER_FAILURE_THRESHOLD, settings.HF_BREAKER_RESET_SECONDS
+        )
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Any]:
+    """State, latency and counters of every breaker, for `/health`."""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,110 @@
+# File: app/services/rules.py
+
+"""
+Deterministic Verification Tier
+
+Author: Mandar K.
+Date: 2025-09-30
+
+This module settles clear-cut certificates without calling the LLM. It
+combines the issuer and name checks from `certificate_processing` with a live
+check of the certificate's QR / verification URL:
+
+  * valid: a URL matching one of a known issuer's `verify_url_patterns`
+    confirms the credential and shows the student's name, and the name is on
+    the certificate.
+  * invalid: such a verification URL says the credential does not exist
+    (404 / 410), or shows a different recipient, and the student's name is not
+    on the certificate either.
+
+Everything else is ambiguous and goes to the LLM tier. That includes URLs that
+are merely on an issuer's domain (a docs.google.com file, a linkedin.com post):
+anyone can publish there, so they prove nothing on their own.
+"""
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services import certificate_processing as cert_proc
+from app.services import verification
+from app.services.issuers import get_registry
+
+TIER_RULES = "rules"
+TIER_LLM = "llm"
+
+
+def _verification_issuer_for_url(url: str) -> Optional[Dict[str, str]]:
+    """The issuer whose verification-URL patterns match `url`, or None (domain-only matches don't count)."""
+    issuer = get_registry().issuer_for_url(url)
+    return issuer.as_dict() if issuer and issuer.is_verification_url(url) else None
+
+
+def _decision(is_valid: bool, confidence: float, reasoning: str,
+              issuer: Optional[Dict[str, str]], matched_name: Optional[str],
+              qr_check: Dict[str, Any]) -> Dict[str, Any]:
+    # Same shape as the LLM verdict, so the payload and the result cache treat both tiers alike.
+    # As there, `confidence` is how likely the certificate is to be valid: low for invalid verdicts.
+    return {
+        "is_valid": is_valid,
+        "status": "valid" if is_valid else "invalid",
+        "confidence_score": confidence,
+        "reasoning": reasoning,
+        "matched_name": matched_name,
+        "issuer": issuer["name"] if issuer else None,
+        "qr_verification": qr_check,
+    }
+
+
+async def evaluate(text: str, qr_urls: List[str], student_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Tries to settle a certificate with deterministic checks.
+
+    Args:
+        text: The text extracted from the certificate.
+        qr_urls: URLs from QR codes or PDF links, best first.
+        student_name: The expected name of the certificate holder.
+
+    Returns:
+        A verdict (with `status` "valid" or "invalid") if the case is clear-cut,
+        or None if it should go to the LLM.
+    """
+    if not settings.RULES_TIER_ENABLED:
+        return None
+    issuer_urls = [url for url in qr_urls if _verification_issuer_for_url(url)]
+    if not issuer_urls:
+        return None  # Without a known issuer's verification URL, nothing is clear-cut
+
+    name_on_certificate = cert_proc.name_matches_authenticated(student_name, text)
+    qr_check = await verification.verify_via_qr_or_link(issuer_urls, text, student_name)
+
+    if qr_check.get("ok") and qr_check["evidence"].get("matched_name"):
+        url_issuer = _verification_issuer_for_url(qr_check["evidence"]["url"])
+        text_issuer = cert_proc.detect_issuer_from_text(text, [])
+        # A certificate branded as one issuer but verified on another's site is not clear-cut.
+        consistent = text_issuer is None or text_issuer["domain"] == url_issuer["domain"]
+        if name_on_certificate and consistent:
+            return _decision(
+                True, 0.95,
+                f"The {url_issuer['name']} verification page confirms the credential for this recipient.",
+                url_issuer, student_name, qr_check,
+            )
+        return None  # The page vouches for the name, but the certificate itself is not conclusive
+
+    if name_on_certificate:
+        return None
+    for page in qr_check.get("evidence", {}).get("pages", []):
+        page_issuer = _verification_issuer_for_url(page.get("url") or "")
+        if page_issuer is None:
+            continue
+        if page.get("status_code") in (404, 410):
+            return _decision(
+                False, 0.05,
+                f"The {page_issuer['name']} verification page reports that this credential does not exist.",
+                page_issuer, None, qr_check,
+            )
+        if page.get("status_code") == 200 and page.get("has_keywords") and not page.get("matched_name"):
+            return _decision(
+                False, 0.1,
+                f"The {page_issuer['name']} verification page names a different recipient.",
+                page_issuer, None, qr_check,
+            )
+    return None
@@ -0,0 +1,136 @@
+# File: app/services/scheduler.py
+
+"""
+Job Scheduler
+
+Author: Mandar K.
+Date: 2025-09-20
+
+This module provides a bounded worker pool for verification jobs. A fixed
+number of worker tasks pull job ids from a bounded queue, so a burst of
+uploads cannot start an unbounded number of concurrent pipelines. When the
+queue is full, new submissions are refused immediately so the API can answer
+with `429 Too Many Requests` instead of letting every job time out together.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be admitted because the queue is at capacity."""
+
+
+class JobScheduler:
+    """A fixed-size pool of asyncio workers fed by a bounded queue."""
+
+    def __init__(self, handler: Callable[[str], Awaitable[Any]], workers: int, max_queue_depth: int):
+        """
+        Args:
+            handler: Coroutine function run for each job id (e.g. `jobs.process_and_forward`).
+            workers: Number of jobs processed concurrently.
+            max_queue_depth: Maximum number of jobs waiting for a worker.
+        """
+        self._handler = handler
+        self._worker_count = max(1, workers)
+        self._max_queue_depth = max(1, max_queue_depth)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._background: Set[asyncio.Task] = set()
+        self._in_flight = 0
+
+    # --- Lifecycle ---
+    def start(self) -> None:
+        """Creates the queue and spawns the worker tasks. Must run inside the event loop."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_queue_depth)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self._worker_count)
+        ]
+        print(f"✅ Job scheduler started with {self._worker_count} worker(s), queue depth {self._max_queue_depth}.")
+
+    async def stop(self) -> None:
+        """Cancels the workers. Jobs still queued stay `queued` in the job store and are recovered on restart."""
+        for task in [*self._workers, *self._background]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._background, return_exceptions=True)
+        self._workers = []
+        self._background.clear()
+
+    # --- Admission ---
+    def has_capacity(self, count: int = 1) -> bool:
+        """Returns True if `count` more jobs can be queued right now."""
+        return self._queue is not None and self.queue_length + count <= self._max_queue_depth
+
+    def submit(self, job_id: str) -> None:
+        """
+        Queues a job without waiting.
+
+        Raises:
+            QueueFullError: If the queue is at capacity or the scheduler is not running.
+        """
+        if self._queue is None:
+            raise QueueFullError("Job scheduler is not running.")
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull as e:
+            raise QueueFullError("Job queue is full.") from e
+
+    def enqueue_in_background(self, job_ids: Iterable[str], delay_seconds: float = 0.0) -> None:
+        """
+        Queues jobs without admission control, waiting for space as needed.
+        Used for startup recovery and for re-queuing deferred jobs, where
+        refusing work is not an option.
+
+        Args:
+            job_ids: The jobs to queue, in order.
+            delay_seconds: How long to wait before queuing them.
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+
+        async def _feed():
+            if delay_seconds > 0:
+                await asyncio.sleep(delay_seconds)
+            for job_id in job_ids:
+                await self._queue.put(job_id)
+
+        task = asyncio.create_task(_feed())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    # --- Introspection ---
+    @property
+    def queue_length(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def stats(self) -> Dict[str, int]:
+        """A snapshot of queue and worker utilisation."""
+        return {
+            "workers": self._worker_count,
+            "queue_length": self.queue_length,
+            "queue_capacity": self._max_queue_depth,
+            "in_flight": self._in_flight,
+            "pending_requeues": len(self._background),
+        }
+
+    # --- Workers ---
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._handler(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Worker {index} crashed while processing job {job_id}: {e}")
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
@@ -0,0 +1,97 @@
+# File: app/services/uploads.py
+
+"""
+Upload Spooling Service
+
+Author: Mandar K.
+Date: 2025-09-24
+
+This module streams uploaded certificates to spool files on disk in fixed-size
+chunks, hashing them incrementally and enforcing a maximum size, so an upload
+is never held in memory as one large `bytes` object. Jobs keep only the spool
+path; downstream stages read from the file (or a memory map of it).
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds `settings.MAX_UPLOAD_BYTES`."""
+
+
+def spool_path_for(job_id: str) -> str:
+    """Returns the spool file location for a job."""
+    return os.path.join(settings.SPOOL_DIR, f"{job_id}.upload")
+
+
+async def spool_upload(file: UploadFile, job_id: str) -> Tuple[str, str, int]:
+    """
+    Streams an upload to the job's spool file, hashing it as it goes.
+
+    Args:
+        file: The incoming upload.
+        job_id: The job the upload belongs to.
+
+    Returns:
+        A tuple of (spool file path, SHA-256 hex digest, size in bytes).
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds `MAX_UPLOAD_BYTES`. The
+            partial spool file is removed before raising.
+    """
+    os.makedirs(settings.SPOOL_DIR, exist_ok=True)
+    path = spool_path_for(job_id)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_BYTES:
+                    raise UploadTooLargeError(
+                        f"Upload exceeds the maximum size of {settings.MAX_UPLOAD_BYTES} bytes."
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        discard(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+@contextmanager
+def open_mapped(path: str) -> Iterator[memoryview]:
+    """
+    Memory-maps a spool file read-only and yields a buffer over its contents.
+
+    Empty files yield an empty buffer (mmap cannot map zero bytes).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def discard(path: str) -> None:
+    """Deletes a spool file, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -119,16 +119,121 @@ pages, and posting the final results to a downstream server.
 import httpx
 import asyncio
 import re
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 from app.core.config import settings
+from app.services import cpu_pool, http_client
+from app.utils.cache import PersistentCache
+
+# --- Verification Page Cache ---
+# Stores the parsed, lowercased page text plus HTTP validators (ETag / Last-Modified).
+# Entries outlive their freshness window so stale pages can be revalidated with a 304.
+page_cache = PersistentCache(
+    settings.CACHE_DB_PATH, "verification_pages",
+    ttl_seconds=settings.PAGE_CACHE_RETENTION_SECONDS,
+    max_bytes=settings.PAGE_CACHE_MAX_BYTES,
+)
+
+def html_to_text(html: str) -> str:
+    """Extracts lowercased visible text from an HTML document. Runs in the CPU pool."""
+    return BeautifulSoup(html, "html.parser").get_text(separator=" ").lower()
+
+def _default_ttl_for(url: str) -> int:
+    """Returns the configured freshness TTL for a URL's host (matching parent domains too)."""
+    host = (urlparse(url).hostname or "").lower()
+    for domain, ttl in settings.PAGE_CACHE_HOST_TTLS.items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+    return settings.PAGE_CACHE_DEFAULT_TTL_SECONDS
+
+def _freshness_lifetime(url: str, headers: httpx.Headers) -> Optional[int]:
+    """
+    Derives how long a response may be reused without revalidation.
+
+    Returns:
+        Seconds of freshness (0 means "always revalidate"), or None if the
+        response must not be stored at all (`Cache-Control: no-store`).
+    """
+    directives = {}
+    for part in headers.get("cache-control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            return int(directives[name])
+    return _default_ttl_for(url)
+
+async def fetch_page_text(page_url: str) -> Tuple[int, str, str]:
+    """
+    Fetches a verification page's text, honouring HTTP caching semantics.
+
+    Fresh cache entries are returned without any request; stale entries with
+    validators are revalidated with a conditional GET, and a 304 reuses the
+    stored text without re-parsing the HTML.
+
+    Args:
+        page_url: The URL of the verification page.
+
+    Returns:
+        A tuple of (HTTP status code, lowercased page text, cache outcome), where the
+        outcome is one of "fresh", "revalidated" or "miss".
+
+    Raises:
+        httpx.HTTPStatusError: For non-2xx responses.
+        httpx.RequestError: For network failures.
+    """
+    now = time.time()
+    entry = page_cache.get(page_url)
+    if entry and entry["fresh_until"] > now:
+        return entry["status_code"], entry["text"], "fresh"
+
+    request_headers = {}
+    if entry:
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+    client = http_client.get_client(http_client.VERIFICATION_PAGES)
+    r = await client.get(page_url, headers=request_headers)
+
+    if r.status_code == 304 and entry:
+        lifetime = _freshness_lifetime(page_url, r.headers)
+        if lifetime is not None:
+            entry["fresh_until"] = now + lifetime
+            entry["etag"] = r.headers.get("etag", entry.get("etag"))
+            entry["last_modified"] = r.headers.get("last-modified", entry.get("last_modified"))
+            page_cache.set(page_url, entry)
+        return entry["status_code"], entry["text"], "revalidated"
+
+    r.raise_for_status() # Raise an exception for non-2xx status codes
+    page_text_low = await cpu_pool.run(html_to_text, r.text)
+
+    lifetime = _freshness_lifetime(page_url, r.headers)
+    if lifetime is not None:
+        page_cache.set(page_url, {
+            "status_code": r.status_code,
+            "text": page_text_low,
+            "etag": r.headers.get("etag"),
+            "last_modified": r.headers.get("last-modified"),
+            "fresh_until": now + lifetime,
+        })
+    return r.status_code, page_text_low, "miss"
 
 async def verify_verification_page(page_url: str, expected_username: Optional[str]) -> Dict[str, Any]:
     """
     Scrapes and analyzes a verification URL (e.g., from a QR code) for evidence of validity.
 
-    This function visits the given URL, extracts its text content, and then applies
-    a series of checks to determine if the page validates the certificate.
+    This function visits the given URL (through the HTTP-aware page cache), extracts
+    its text content, and then applies a series of checks to determine if the page
+    validates the certificate.
 
     Args:
         page_url: The URL of the verification page to check.
@@ -140,40 +245,40 @@ async def verify_verification_page(page_url: str, expected_username: Optional[st
     """
     evidence: Dict[str, Any] = {"url": page_url, "status_code": None, "matched_name": False, "has_keywords": False}
     try:
-        async with httpx.AsyncClient(timeout=settings.POST_TIMEOUT_SECONDS, follow_redirects=True) as client:
-            r = await client.get(page_url)
-            evidence["status_code"] = r.status_code
-            r.raise_for_status() # Raise an exception for non-2xx status codes
-
-            soup = BeautifulSoup(r.text, "html.parser")
-            page_text_low = soup.get_text(separator=" ").lower()
-            evidence["text_snippet"] = page_text_low[:800]
-
-            # --- Heuristic Checks ---
-            score = 0.0
-            methods = []
-
-            # 1. Check for verification-related keywords
-            keywords = ["verify", "verified", "certificate", "credential", "valid", "issued to", "completed"]
-            if any(k in page_text_low for k in keywords):
+        status_code, page_text_low, cache_outcome = await fetch_page_text(page_url)
+        evidence["status_code"] = status_code
+        evidence["cache"] = cache_outcome
+        evidence["text_snippet"] = page_text_low[:800]
+
+        # --- Heuristic Checks ---
+        score = 0.0
+        methods = []
+
+        # 1. Check for verification-related keywords
+        keywords = ["verify", "verified", "certificate", "credential", "valid", "issued to", "completed"]
+        if any(k in page_text_low for k in keywords):
+            score += 0.50
+            methods.append("verification-page-keywords")
+            evidence["has_keywords"] = True
+
+        # 2. Check for the user's name on the page
+        if expected_username:
+            # Normalize and split the name to check for partial matches (e.g., first and last name)
+            name_tokens = [token for token in re.split(r'\W+', expected_username.lower()) if len(token) > 2]
+            matches = sum(1 for token in name_tokens if token in page_text_low)
+            
+            # Require at least two name parts to match for a confident result
+            if matches >= 2:
                 score += 0.50
-                methods.append("verification-page-keywords")
-                evidence["has_keywords"] = True
-
-            # 2. Check for the user's name on the page
-            if expected_username:
-                # Normalize and split the name to check for partial matches (e.g., first and last name)
-                name_tokens = [token for token in re.split(r'\W+', expected_username.lower()) if len(token) > 2]
-                matches = sum(1 for token in name_tokens if token in page_text_low)
-                
-                # Require at least two name parts to match for a confident result
-                if matches >= 2:
-                    score += 0.50
-                    methods.append("name-on-verification-page")
-                    evidence["matched_name"] = True
-
-            return {"ok": score >= 0.75, "score": min(score, 1.0), "methods": methods, "evidence": evidence}
+                methods.append("name-on-verification-page")
+                evidence["matched_name"] = True
+
+        return {"ok": score >= 0.75, "score": min(score, 1.0), "methods": methods, "evidence": evidence}
 
+    except httpx.HTTPStatusError as e:
+        evidence["status_code"] = e.response.status_code
+        evidence["error"] = f"Verification page returned HTTP {e.response.status_code}."
+        return {"ok": False, "score": 0.0, "methods": [], "evidence": evidence}
     except httpx.RequestError as e:
         evidence["error"] = f"Network error fetching URL: {str(e)}"
         return {"ok": False, "score": 0.0, "methods": [], "evidence": evidence}
@@ -182,9 +287,27 @@ async def verify_verification_page(page_url: str, expected_username: Optional[st
         return {"ok": False, "score": 0.0, "methods": [], "evidence": evidence}
 
 
+# One semaphore per host, shared by all jobs, so a single issuer is never hammered.
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = (urlparse(url).hostname or "").lower()
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = _host_semaphores[host] = asyncio.Semaphore(settings.PAGE_FETCH_PER_HOST_LIMIT)
+    return semaphore
+
+async def _verify_page_with_host_limit(page_url: str, expected_username: Optional[str]) -> Dict[str, Any]:
+    async with _host_semaphore(page_url):
+        return await verify_verification_page(page_url, expected_username)
+
+
 async def verify_via_qr_or_link(qr_urls: List[str], extracted_text: str, student_name: str) -> Dict[str, Any]:
     """
-    Iterates through QR code URLs and uses the most reliable one for verification.
+    Checks all QR code URLs concurrently and returns the first successful verification.
+
+    Remaining fetches are cancelled as soon as one URL verifies, and each host is
+    limited to `PAGE_FETCH_PER_HOST_LIMIT` concurrent fetches across all jobs.
 
     Args:
         qr_urls: A list of URLs found in QR codes.
@@ -197,18 +320,31 @@ async def verify_via_qr_or_link(qr_urls: List[str], extracted_text: str, student
     if not qr_urls:
         return {"ok": False, "score": 0.0, "methods": [], "evidence": None}
 
-    # Attempt to verify each URL found and return the first successful one
-    for url in qr_urls:
-        if not (url.startswith("http://") or url.startswith("https://")):
-            continue
-        
-        # Pass the student's name for a more reliable check
-        result = await verify_verification_page(url, student_name or extracted_text)
-        if result.get("ok"):
-            return result
-            
+    # De-duplicate (front/back QR codes often carry the same link) and keep only web URLs
+    urls = list(dict.fromkeys(
+        url for url in qr_urls if url.startswith("http://") or url.startswith("https://")
+    ))
+
+    # Pass the student's name for a more reliable check
+    tasks = [
+        asyncio.create_task(_verify_page_with_host_limit(url, student_name or extracted_text))
+        for url in urls
+    ]
+    checked: List[Dict[str, Any]] = []
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            if result.get("ok"):
+                return result
+            checked.append(result.get("evidence") or {})
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
     # If no URL yields a positive verification, return a default failure response
-    return {"ok": False, "score": 0.0, "methods": [], "evidence": {"checked_urls": qr_urls}}
+    return {"ok": False, "score": 0.0, "methods": [], "evidence": {"checked_urls": qr_urls, "pages": checked}}
 
 
 async def post_to_server(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -221,14 +357,14 @@ async def post_to_server(payload: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         A dictionary indicating the outcome of the POST request.
     """
-    async with httpx.AsyncClient(timeout=settings.POST_TIMEOUT_SECONDS) as client:
-        last_exc = None
-        for attempt in range(settings.POST_RETRIES):
-            try:
-                r = await client.post(settings.SERVER_ENDPOINT, json=payload, timeout=settings.POST_TIMEOUT_SECONDS)
-                r.raise_for_status()
-                return {"ok": True, "status_code": r.status_code, "response_text": r.text}
-            except Exception as e:
-                last_exc = e
-                await asyncio.sleep(1) # Wait 1 second before retrying
+    client = http_client.get_client(http_client.DOWNSTREAM_SERVER)
+    last_exc = None
+    for attempt in range(settings.POST_RETRIES):
+        try:
+            r = await client.post(settings.SERVER_ENDPOINT, json=payload, timeout=settings.POST_TIMEOUT_SECONDS)
+            r.raise_for_status()
+            return {"ok": True, "status_code": r.status_code, "response_text": r.text}
+        except Exception as e:
+            last_exc = e
+            await asyncio.sleep(1) # Wait 1 second before retrying
     return {"ok": False, "error": str(last_exc)}
@@ -0,0 +1,178 @@
+# File: app/services/warmup.py
+
+"""
+Model Warm-up and Keep-warm
+
+Author: Mandar K.
+Date: 2025-10-03
+
+Serverless Hugging Face models are unloaded when idle, and the first request
+after a deploy or a quiet period waits for a cold start. This module:
+
+  * warms both models (TrOCR and Mistral) from `lifespan` with a minimal real
+    inference, retrying until they answer, and reports readiness on `/health`.
+    TrOCR is skipped when `OCR_POLICY` is "local", since it is never called.
+    Readiness only covers this initial warm-up: a model going cold later is
+    reported in the model stats but does not make the service unready;
+  * keeps them warm with a cheap ping every `KEEP_WARM_INTERVAL_SECONDS`, but
+    only when no real traffic has reached a model since the last check. After
+    `KEEP_WARM_IDLE_SECONDS` without traffic the interval doubles on each ping,
+    up to `KEEP_WARM_MAX_INTERVAL_SECONDS`, so a quiet service stops paying for
+    pings. The first real call resets it.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services import huggingface as hf_service
+from app.services.resilience import CircuitBreaker, UpstreamUnavailableError, get_breaker
+
+
+class ModelWarmer:
+    """Warm-up and keep-warm state for one model endpoint."""
+
+    def __init__(self, name: str, breaker: CircuitBreaker, ping: Callable[[], Awaitable[bool]],
+                 needed: Callable[[], bool] = lambda: True):
+        """
+        Args:
+            name: Model name used in logs and stats.
+            breaker: The model's circuit breaker (its success counter shows real traffic).
+            ping: Sends one warm-up call.
+            needed: Whether the service calls this model at all under the current settings.
+        """
+        self.name = name
+        self.breaker = breaker
+        self.ping = ping
+        self.needed = needed
+        self.ready = not settings.WARMUP_ENABLED
+        self.warmed_up = self.ready  # Set once the first warm-up succeeds; never cleared
+        self.warmed_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.interval = settings.KEEP_WARM_INTERVAL_SECONDS
+        self.pings = 0
+        self._last_traffic = time.monotonic()
+        self._seen_successes = 0
+
+    async def _ping_once(self) -> Optional[float]:
+        """
+        Sends one ping. Returns None on success, or how long to wait before
+        trying again.
+        """
+        self.pings += 1
+        try:
+            ok = await self.ping()
+        except UpstreamUnavailableError as e:
+            self.last_error = str(e)
+            return max(1.0, e.retry_after)
+        finally:
+            # Our own ping is not traffic
+            self._seen_successes = self.breaker.counters["successes"]
+        if not ok:
+            self.last_error = "ping failed"
+            return self.breaker.reset_seconds
+        if not self.ready:
+            print(f"🔥 {self.name} model is warm.")
+        self.ready = self.warmed_up = True
+        self.warmed_at = datetime.utcnow().isoformat()
+        self.last_error = None
+        return None
+
+    async def warm_up(self) -> bool:
+        """Pings the model until it answers or `WARMUP_TIMEOUT_SECONDS` pass. Returns True if it is warm."""
+        deadline = time.monotonic() + settings.WARMUP_TIMEOUT_SECONDS
+        while True:
+            retry_in = await self._ping_once()
+            if retry_in is None:
+                return True
+            if time.monotonic() + retry_in > deadline:
+                print(f"⚠️ {self.name} model is still not ready after warm-up ({self.last_error}); keep-warm will retry.")
+                return False
+            print(f"⏳ {self.name} model is warming up ({self.last_error}); retrying in {retry_in:.0f}s.")
+            await asyncio.sleep(retry_in)
+
+    async def keep_warm(self) -> None:
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            now = time.monotonic()
+            if self.breaker.counters["successes"] > self._seen_successes:
+                # Real calls since the last check kept the model warm; no ping needed.
+                self._seen_successes = self.breaker.counters["successes"]
+                self._last_traffic = now
+                self.interval = delay = settings.KEEP_WARM_INTERVAL_SECONDS
+                self.ready = self.warmed_up = True
+                continue
+            if now - self._last_traffic > settings.KEEP_WARM_IDLE_SECONDS:
+                self.interval = min(self.interval * 2, settings.KEEP_WARM_MAX_INTERVAL_SECONDS)
+            delay = self.interval
+            try:
+                retry_in = await self._ping_once()
+            except Exception as e:
+                print(f"❌ {self.name} keep-warm ping failed: {e}")
+                continue
+            if retry_in is not None:
+                # Went cold (or is failing): not ready, and check again sooner.
+                self.ready = False
+                delay = min(retry_in, self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmed_up": self.warmed_up,
+            "warmed_at": self.warmed_at,
+            "last_error": self.last_error,
+            "keep_warm_interval_seconds": self.interval,
+            "pings": self.pings,
+        }
+
+
+warmers: List[ModelWarmer] = [
+    ModelWarmer("ocr", get_breaker("ocr"), hf_service.ping_ocr, needed=lambda: settings.OCR_POLICY != "local"),
+    ModelWarmer("ai-verification", get_breaker("ai-verification"), hf_service.ping_verification),
+]
+_tasks: List[asyncio.Task] = []
+
+
+async def _run(warmer: ModelWarmer) -> None:
+    if settings.WARMUP_ENABLED:
+        try:
+            await warmer.warm_up()
+        except Exception as e:
+            print(f"❌ {warmer.name} warm-up failed: {e}")
+    if settings.KEEP_WARM_ENABLED:
+        await warmer.keep_warm()
+
+
+def _active() -> List[ModelWarmer]:
+    return [warmer for warmer in warmers if warmer.needed()]
+
+
+def start() -> None:
+    """Starts warm-up and keep-warm in the background. Must run inside the event loop."""
+    if _tasks or not (settings.WARMUP_ENABLED or settings.KEEP_WARM_ENABLED):
+        return
+    for warmer in _active():
+        _tasks.append(asyncio.create_task(_run(warmer), name=f"warmup-{warmer.name}"))
+
+
+async def stop() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+def is_warmed_up() -> bool:
+    """True once every model in use has answered a warm-up ping or a real request. Stays True afterwards."""
+    return all(warmer.warmed_up for warmer in _active())
+
+
+def is_ready() -> bool:
+    """True while every model in use is currently warm (a keep-warm ping may have found one cold)."""
+    return all(warmer.ready for warmer in _active())
+
+
+def stats() -> Dict[str, Any]:
+    return {warmer.name: warmer.stats() for warmer in _active()}
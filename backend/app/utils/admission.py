@@ -0,0 +1,60 @@
+# File: app/utils/admission.py
+
+"""
+Early Queue Admission
+
+Author: Mandar K.
+Date: 2025-10-05
+
+FastAPI reads and spools the whole multipart form before an endpoint (or any
+of its dependencies) runs, so a queue-depth check in the endpoint only rejects
+a request after its uploads have been received. This ASGI middleware runs the
+check first and answers 429 with `Retry-After` without reading the body. The
+endpoints keep their own check after parsing, to catch jobs admitted in the
+meantime.
+"""
+import json
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class QueueAdmissionMiddleware:
+    """Rejects uploads to queueing routes while the job queue has no room."""
+
+    def __init__(self, app: Callable, paths: Iterable[str], has_capacity: Callable[[], bool],
+                 retry_after_seconds: int):
+        """
+        Args:
+            app: The ASGI app to wrap.
+            paths: Request paths that queue jobs (POST requests only).
+            has_capacity: Returns True if at least one more job can be queued.
+            retry_after_seconds: Sent as `Retry-After` with the 429.
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+        self.has_capacity = has_capacity
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope.get("method") == "POST"
+            and scope.get("path") in self.paths
+            and not self.has_capacity()
+        ):
+            await self._send_429(send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _send_429(self, send: Send) -> None:
+        body = json.dumps({"detail": "Verification queue is full. Please retry later."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(self.retry_after_seconds).encode()), (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
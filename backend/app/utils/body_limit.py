@@ -0,0 +1,101 @@
+# File: app/utils/body_limit.py
+
+"""
+Request Body Size Limit
+
+Author: Mandar K.
+Date: 2025-10-04
+
+FastAPI parses a multipart form into `UploadFile`s before the endpoint runs,
+so a size check inside the endpoint only happens after the whole body has been
+received. This ASGI middleware enforces per-route limits before parsing:
+
+  * a `Content-Length` over the limit is answered with 413 without reading the body;
+  * otherwise (including chunked bodies with no `Content-Length`) the bytes are
+    counted as the app reads them, and reading stops with 413 as soon as the
+    count passes the limit.
+"""
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class BodyTooLargeError(Exception):
+    """Raised from `receive` once a request body passes its limit."""
+
+
+class BodySizeLimitMiddleware:
+    """Rejects request bodies larger than the limit configured for their route."""
+
+    def __init__(self, app: Callable, limits: Dict[str, int]):
+        """
+        Args:
+            app: The ASGI app to wrap.
+            limits: Maximum body size in bytes, by request path (POST requests only).
+        """
+        self.app = app
+        self.limits = limits
+
+    def _limit_for(self, scope: Scope) -> Optional[int]:
+        if scope["type"] != "http" or scope.get("method") != "POST":
+            return None
+        return self.limits.get(scope.get("path", ""))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self._limit_for(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length", b"").decode("latin-1")
+        if content_length.isdigit() and int(content_length) > limit:
+            await _send_413(send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise BodyTooLargeError(f"Request body exceeds {limit} bytes.")
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if exceeded:
+                # The app may have turned our error into its own response (FastAPI answers
+                # body-parsing errors with 400); answer 413 instead.
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await _send_413(send, limit)
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except BodyTooLargeError:
+            if not response_started:
+                await _send_413(send, limit)
+
+
+async def _send_413(send: Send, limit: int) -> None:
+    body = json.dumps({"detail": f"Request body exceeds the maximum size of {limit} bytes."}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close")],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,266 @@
+# File: app/utils/cache.py
+
+"""
+Cache Utilities
+
+Author: Mandar K.
+Date: 2025-09-22
+
+This module provides a small persistent key/value cache on top of SQLite.
+Values are stored as JSON, expire after a TTL, and the least recently used
+entries are evicted once the cache grows past its entry or byte budget. An
+in-memory LRU tier, a two-tier wrapper with hit-rate counters and a
+single-flight helper for coalescing identical in-flight requests build on it.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class PersistentCache:
+    """A JSON key/value cache stored in one table of a SQLite database."""
+
+    def __init__(self, db_path: str, table: str, ttl_seconds: float,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite file to use. Several caches may share one file.
+            table: Table name for this cache (must be a plain identifier).
+            ttl_seconds: How long an entry stays valid after it is written.
+            max_entries: Evict least recently used entries beyond this count.
+            max_bytes: Evict least recently used entries beyond this total value size.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.db_path = db_path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key        TEXT PRIMARY KEY,
+                    value      TEXT NOT NULL,
+                    size       INTEGER NOT NULL,
+                    expiresAt  REAL NOT NULL,
+                    accessedAt REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table} (accessedAt);
+                CREATE INDEX IF NOT EXISTS idx_{self.table}_expires ON {self.table} (expiresAt);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for `key`, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(f"SELECT value, expiresAt FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            db.execute(f"UPDATE {self.table} SET accessedAt = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Stores a JSON-serialisable value, then enforces the size limits."""
+        encoded = json.dumps(value, default=str)
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, expiresAt, accessedAt) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), expires_at, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _evict(self, now: float) -> None:
+        db = self._db()
+        db.execute(f"DELETE FROM {self.table} WHERE expiresAt <= ?", (now,))
+        if self.max_entries:
+            count = db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                db.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessedAt LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        if self.max_bytes:
+            total = db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk entries oldest-first until enough bytes have been freed.
+                excess, victims = total - self.max_bytes, []
+                for key, size in db.execute(f"SELECT key, size FROM {self.table} ORDER BY accessedAt"):
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                db.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of entries and their total size in bytes."""
+        with self._lock:
+            count, total = self._db().execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        return {"entries": count, "bytes": total}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class MemoryLRUCache:
+    """A thread-safe in-memory LRU cache bounded by the total size of its values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        if isinstance(value, str):
+            return len(value.encode("utf-8"))
+        return len(json.dumps(value, default=str))
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return  # Never let a single oversized value flush the whole tier
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class TwoTierCache:
+    """
+    A memory LRU in front of a persistent SQLite cache, with hit-rate counters.
+
+    Disk hits are promoted into the memory tier.
+    """
+
+    def __init__(self, memory: MemoryLRUCache, disk: PersistentCache):
+        self.memory = memory
+        self.disk = disk
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.counters["memory_hits"] += 1
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.counters["disk_hits"] += 1
+            self.memory.set(key, value)
+            return value
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = sum(self.counters.values())
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats(),
+        }
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key so only one of them runs.
+
+    The call runs in its own task, and every caller awaiting the same key
+    receives its result (or exception). Cancelling a caller only detaches that
+    caller; the call itself is cancelled once no caller is waiting for it.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = self._in_flight[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up; later callers for the key start afresh.
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+                flight.task.cancel()
+
+    def _finished(self, key: str, flight: _Flight) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if not flight.task.cancelled():
+            # Mark retrieved so an exception nobody awaited is not logged as unhandled
+            flight.task.exception()
@@ -0,0 +1,122 @@
+# File: app/utils/imaging.py
+
+"""
+Image Decoding Utilities
+
+Author: Mandar K.
+Date: 2025-09-29
+
+Helpers for decoding uploaded photos at no more than the resolution the
+pipeline needs. Image headers are read first, so oversized images
+(decompression bombs) are refused before any pixel buffer is allocated. JPEGs
+are then decoded at a reduced scale (Pillow draft mode / OpenCV
+`IMREAD_REDUCED_*`), and EXIF orientation is applied.
+"""
+import io
+from typing import Any, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+# Let Pillow itself refuse anything past the budget too (it raises at twice MAX_IMAGE_PIXELS).
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+# OpenCV reduced-decode flags by scale denominator, largest reduction first.
+_CV2_REDUCED_COLOR = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image's dimensions exceed `settings.IMAGE_MAX_PIXELS`."""
+
+
+def check_pixel_budget(width: int, height: int) -> None:
+    """Raises `ImageTooLargeError` if a width x height image is over the pixel budget."""
+    if settings.IMAGE_MAX_PIXELS and width * height > settings.IMAGE_MAX_PIXELS:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height} pixels); the limit is {settings.IMAGE_MAX_PIXELS} pixels."
+        )
+
+
+def _open_header(source: Any) -> Image.Image:
+    """Opens an image lazily (header only) and enforces the pixel budget."""
+    try:
+        img = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+    try:
+        check_pixel_budget(*img.size)
+    except ImageTooLargeError:
+        img.close()
+        raise
+    return img
+
+
+def open_image_reduced(source: Any, max_side: int) -> Image.Image:
+    """
+    Decodes an image (path or file object) to an upright RGB image whose
+    longest side is at most `max_side`.
+
+    Args:
+        source: A filesystem path or binary file object.
+        max_side: Longest side of the returned image, in pixels. 0 disables downscaling.
+
+    Raises:
+        ImageTooLargeError: If the image is over the pixel budget (checked before decoding).
+    """
+    with _open_header(source) as img:
+        if max_side and max(img.size) > max_side:
+            # JPEG only: decode straight to the smallest 1/2, 1/4 or 1/8 scale still >= the target.
+            scale = max_side / max(img.size)
+            img.draft("RGB", (int(img.width * scale) + 1, int(img.height * scale) + 1))
+        upright = ImageOps.exif_transpose(img)
+        image = upright.convert("RGB")
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+    return image
+
+
+def decode_cv2_reduced(image_bytes: bytes, max_side: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Decodes image bytes into an upright BGR array whose longest side is at most
+    `max_side`, using OpenCV's reduced-resolution JPEG decoding where possible.
+
+    Returns:
+        A tuple of (BGR image, original (width, height)).
+
+    Raises:
+        ImageTooLargeError: If the image is over the pixel budget (checked before decoding).
+        ValueError: If the bytes are not a supported image.
+    """
+    try:
+        with _open_header(io.BytesIO(image_bytes)) as header:
+            width, height = header.size
+            orientation = header.getexif().get(0x0112, 1)
+    except ImageTooLargeError:
+        raise
+    except Exception:
+        raise ValueError("Invalid or unsupported image format.")
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width  # Stored sideways; OpenCV rotates it upright on decode
+
+    flags = cv2.IMREAD_COLOR
+    if max_side:
+        for factor, reduced_flag in _CV2_REDUCED_COLOR:
+            if max(width, height) / factor >= max_side:
+                flags = reduced_flag
+                break
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+    if image is None:
+        raise ValueError("Invalid or unsupported image format.")
+    longest = max(image.shape[:2])
+    if max_side and longest > max_side:
+        scale = max_side / longest
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image, (width, height)
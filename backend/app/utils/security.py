@@ -5,14 +5,18 @@ Security Utilities
 Author: Maddy (Originally by Gemini)
 
 This module provides helper functions for cryptographic operations
-like hashing and AES-GCM encryption.
+like hashing and AES-GCM encryption, including a chunked, streaming
+binary container for encrypted uploads.
 """
 import os
 import base64
 import hashlib
-from typing import Dict
+import struct
+from typing import BinaryIO, Dict, Tuple
 from app.core.config import settings
+from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.exceptions import InvalidTag
 
 
@@ -70,4 +74,168 @@ def decrypt_aes_gcm(encrypted_data: dict[str, str]) -> bytes:
         return aesgcm.decrypt(nonce, ct, None)
     except (KeyError, InvalidTag) as e:
         # Handle cases where decryption fails or data is malformed
-        raise ValueError("Decryption failed. Ciphertext may be corrupt or the key incorrect.") from e
\ No newline at end of file
+        raise ValueError("Decryption failed. Ciphertext may be corrupt or the key incorrect.") from e
+
+# --- Streaming Encrypted Blob Format (v2) ---
+#
+# Layout:
+#   header = MAGIC (4) | version (1) | key id length (1) | key id | salt (32) | chunk size (4, big-endian)
+#   then one record per plaintext chunk: AES-GCM(chunk) including its 16-byte tag.
+#
+# Every blob is encrypted under its own key, HKDF-SHA256(AES_KEY, salt), so nonces only have to be
+# unique within one blob. Each chunk uses the STREAM construction: nonce = 7 zero bytes || counter
+# (4, big-endian) || last-chunk flag (1), and the whole header is bound to every chunk as associated
+# data. Reordering, truncating or appending chunks, or tampering with the header, therefore fails
+# authentication.
+#
+# v1 blobs used AES_KEY directly with a random 7-byte nonce prefix in place of the salt. Prefixes
+# collide (reusing GCM nonces) far too soon across many blobs, so v1 is only read, never written.
+BLOB_MAGIC = b"TSEB"
+BLOB_VERSION = 2
+BLOB_SALT_LEN = 32
+NONCE_PREFIX_LEN = 7
+TAG_LEN = 16
+MAX_CHUNKS = 2 ** 32
+_V2_NONCE_PREFIX = bytes(NONCE_PREFIX_LEN)
+_BLOB_KEY_INFO = b"talentsync encrypted blob v2"
+
+
+def current_key_id() -> str:
+    """Identifies the active AES key without revealing it (configured id, or a key fingerprint)."""
+    if AES_KEY is None:
+        raise RuntimeError("AES key has not been initialized.")
+    return settings.AES_KEY_ID or hashlib.sha256(AES_KEY).hexdigest()[:16]
+
+
+def _chunk_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    if counter >= MAX_CHUNKS:
+        raise ValueError("Too many chunks for a single encrypted blob.")
+    return prefix + struct.pack(">IB", counter, 1 if last else 0)
+
+
+def _blob_key(salt: bytes) -> bytes:
+    """Derives a blob's own 256-bit key from AES_KEY and the blob's random salt."""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=_BLOB_KEY_INFO).derive(AES_KEY)
+
+
+def _build_header(key_id: bytes, salt: bytes, chunk_size: int) -> bytes:
+    return BLOB_MAGIC + struct.pack(">BB", BLOB_VERSION, len(key_id)) + key_id + salt + struct.pack(">I", chunk_size)
+
+
+def _read_header(src: BinaryIO) -> Tuple[bytes, int, str, bytes, int]:
+    """
+    Parses a blob header. Returns (raw header bytes, version, key id, salt (v2)
+    or nonce prefix (v1), chunk size).
+    """
+    fixed = src.read(len(BLOB_MAGIC) + 2)
+    if len(fixed) != len(BLOB_MAGIC) + 2 or fixed[:4] != BLOB_MAGIC:
+        raise ValueError("Not an encrypted blob: bad magic.")
+    version, key_id_len = struct.unpack(">BB", fixed[4:])
+    if version not in (1, BLOB_VERSION):
+        raise ValueError(f"Unsupported encrypted blob version: {version}.")
+    material_len = BLOB_SALT_LEN if version == BLOB_VERSION else NONCE_PREFIX_LEN
+    rest = src.read(key_id_len + material_len + 4)
+    if len(rest) != key_id_len + material_len + 4:
+        raise ValueError("Encrypted blob header is truncated.")
+    key_id = rest[:key_id_len].decode("ascii")
+    material = rest[key_id_len:key_id_len + material_len]
+    (chunk_size,) = struct.unpack(">I", rest[key_id_len + material_len:])
+    return fixed + rest, version, key_id, material, chunk_size
+
+
+def encrypt_stream(src: BinaryIO, dst: BinaryIO, chunk_size: int | None = None) -> int:
+    """
+    Encrypts `src` into `dst` in the chunked binary blob format, in constant memory.
+
+    Args:
+        src: Readable binary stream of plaintext.
+        dst: Writable binary stream for the encrypted blob.
+        chunk_size: Plaintext bytes per chunk (defaults to `settings.ENCRYPTION_CHUNK_BYTES`).
+
+    Returns:
+        The number of bytes written to `dst`.
+    """
+    if AES_KEY is None:
+        raise RuntimeError("AES key has not been initialized.")
+    chunk_size = chunk_size or settings.ENCRYPTION_CHUNK_BYTES
+    salt = os.urandom(BLOB_SALT_LEN)
+    aesgcm = AESGCM(_blob_key(salt))
+    nonce_prefix = _V2_NONCE_PREFIX
+    header = _build_header(current_key_id().encode("ascii"), salt, chunk_size)
+    dst.write(header)
+    written = len(header)
+
+    counter = 0
+    chunk = src.read(chunk_size)
+    while True:
+        # Read one chunk ahead so the final chunk can be flagged as last.
+        next_chunk = src.read(chunk_size)
+        last = not next_chunk
+        record = aesgcm.encrypt(_chunk_nonce(nonce_prefix, counter, last), chunk, header)
+        dst.write(record)
+        written += len(record)
+        if last:
+            return written
+        chunk = next_chunk
+        counter += 1
+
+
+def decrypt_stream(src: BinaryIO, dst: BinaryIO) -> int:
+    """
+    Decrypts a chunked binary blob from `src` into `dst`, in constant memory.
+
+    Returns:
+        The number of plaintext bytes written.
+
+    Raises:
+        ValueError: If the blob is malformed, truncated, tampered with, or was
+            encrypted under a different key.
+    """
+    if AES_KEY is None:
+        raise RuntimeError("AES key has not been initialized.")
+    header, version, key_id, material, chunk_size = _read_header(src)
+    if key_id != current_key_id():
+        raise ValueError(f"Encrypted blob was written with key '{key_id}', which is not the active key.")
+    if version == BLOB_VERSION:
+        aesgcm, nonce_prefix = AESGCM(_blob_key(material)), _V2_NONCE_PREFIX
+    else:
+        aesgcm, nonce_prefix = AESGCM(AES_KEY), material
+    record_size = chunk_size + TAG_LEN
+
+    written = 0
+    counter = 0
+    record = src.read(record_size)
+    while True:
+        next_record = src.read(record_size)
+        last = not next_record
+        try:
+            chunk = aesgcm.decrypt(_chunk_nonce(nonce_prefix, counter, last), record, header)
+        except InvalidTag as e:
+            raise ValueError("Decryption failed. Blob may be corrupt, truncated or the key incorrect.") from e
+        dst.write(chunk)
+        written += len(chunk)
+        if last:
+            return written
+        record = next_record
+        counter += 1
+
+
+def decrypt_blob_file(path: str, dst: BinaryIO) -> int:
+    """
+    Decrypts an encrypted upload on disk into `dst`.
+
+    Reads both the chunked binary format and the legacy text format
+    (`nonce_b64` and `ciphertext_b64` separated by a newline).
+
+    Returns:
+        The number of plaintext bytes written.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(BLOB_MAGIC)) == BLOB_MAGIC:
+            f.seek(0)
+            return decrypt_stream(f, dst)
+        f.seek(0)
+        nonce_b64, _, ciphertext_b64 = f.read().decode("utf-8").partition("\n")
+    plaintext = decrypt_aes_gcm({"nonce_b64": nonce_b64.strip(), "ciphertext_b64": ciphertext_b64.strip()})
+    dst.write(plaintext)
+    return len(plaintext)
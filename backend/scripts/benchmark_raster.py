@@ -0,0 +1,103 @@
+# File: scripts/benchmark_raster.py
+
+"""
+Rasterization / OCR Upload Profile Benchmark
+
+Author: Mandar K.
+Date: 2025-09-28
+
+Renders sample certificates with several rasterization + upload-encoding
+profiles and reports, per profile, the bitmap size, the bytes that would be
+sent to the OCR model, and the time spent in each stage. With `--ocr` each
+encoded image is also sent to the Hugging Face OCR model, so the end-to-end
+latency includes the upload and inference.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_raster samples/*.pdf samples/*.png [--repeat 3] [--ocr]
+"""
+import argparse
+import asyncio
+import mimetypes
+import statistics
+import time
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.services import certificate_processing as cert_proc
+from app.services import http_client
+from app.services import huggingface as hf_service
+
+# Each profile overrides the matching `Settings` fields for the duration of its run.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "legacy": {"RASTER_DPI": 200, "RASTER_GRAYSCALE": False, "RASTER_MAX_PIXELS": 0, "OCR_UPLOAD_FORMAT": "png"},
+    "configured": {},
+    "gray-150-png": {"RASTER_DPI": 150, "RASTER_GRAYSCALE": True, "OCR_UPLOAD_FORMAT": "png"},
+    "gray-150-jpeg85": {"RASTER_DPI": 150, "RASTER_GRAYSCALE": True, "OCR_UPLOAD_FORMAT": "jpeg", "OCR_UPLOAD_QUALITY": 85},
+    "gray-120-webp75": {"RASTER_DPI": 120, "RASTER_GRAYSCALE": True, "OCR_UPLOAD_FORMAT": "webp", "OCR_UPLOAD_QUALITY": 75},
+}
+
+
+def _apply(overrides: Dict[str, Any]) -> Dict[str, Any]:
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return previous
+
+
+async def _run_once(path: str, content_type: str, send_to_ocr: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    image = cert_proc.get_image_from_file(path, content_type)
+    if image is None:
+        raise RuntimeError(f"Could not rasterize {path}")
+    rasterized = time.perf_counter()
+    payload = hf_service.encode_image_for_upload(image)
+    encoded = time.perf_counter()
+    ocr_ok = None
+    if send_to_ocr:
+        ocr_ok = await hf_service._post_ocr(payload) is not None
+    finished = time.perf_counter()
+    return {
+        "ocr_ok": ocr_ok,
+        "pixels": image.width * image.height,
+        "bytes": len(payload),
+        "raster_ms": (rasterized - started) * 1000,
+        "encode_ms": (encoded - rasterized) * 1000,
+        "total_ms": (finished - started) * 1000,
+    }
+
+
+async def benchmark(paths: List[str], repeat: int, send_to_ocr: bool) -> None:
+    """Runs every profile in one event loop, so the shared HTTP client's pooled connections stay valid."""
+    http_client.start()
+    try:
+        print(f"{'profile':<18} {'file':<28} {'pixels':>10} {'bytes':>10} {'raster ms':>10} {'encode ms':>10} {'total ms':>10} {'ocr ok':>7}")
+        for name, overrides in PROFILES.items():
+            previous = _apply(overrides)
+            try:
+                for path in paths:
+                    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    runs = [await _run_once(path, content_type, send_to_ocr) for _ in range(repeat)]
+                    median = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key != "ocr_ok"}
+                    # Failed OCR calls return instantly; report them so they are not mistaken for fast ones.
+                    ocr_ok = f"{sum(bool(run['ocr_ok']) for run in runs)}/{repeat}" if send_to_ocr else "-"
+                    print(
+                        f"{name:<18} {path[-28:]:<28} {median['pixels']:>10.0f} {median['bytes']:>10.0f} "
+                        f"{median['raster_ms']:>10.1f} {median['encode_ms']:>10.1f} {median['total_ms']:>10.1f} {ocr_ok:>7}"
+                    )
+            finally:
+                _apply(previous)
+    finally:
+        await http_client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Sample certificates (PDF or image)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file and profile (median is reported)")
+    parser.add_argument("--ocr", action="store_true", help="Also send each payload to the Hugging Face OCR model")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.paths, args.repeat, args.ocr))
+
+
+if __name__ == "__main__":
+    main()
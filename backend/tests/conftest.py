@@ -0,0 +1,11 @@
+# File: tests/conftest.py
+
+import base64
+import os
+import sys
+
+# Settings are required at import time; tests never touch real keys or endpoints.
+os.environ.setdefault("AES_KEY_BASE64", base64.b64encode(b"0" * 32).decode())
+os.environ.setdefault("HUGGINGFACE_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+# File: tests/test_admission.py
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.admission import QueueAdmissionMiddleware
+
+
+def _client(capacity):
+    app = FastAPI()
+    seen = []
+
+    @app.post("/verify")
+    async def verify(file: UploadFile = File(...)):
+        seen.append(file.filename)
+        return {"ok": True}
+
+    @app.get("/verify")
+    async def status():
+        return {"ok": True}
+
+    app.add_middleware(
+        QueueAdmissionMiddleware, paths=["/verify"], has_capacity=lambda: capacity["free"], retry_after_seconds=7,
+    )
+    return TestClient(app), seen
+
+
+def test_full_queue_rejects_before_reading_the_upload():
+    client, seen = _client({"free": False})
+
+    def body():
+        seen.append("body read")
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\nx\r\n--b--\r\n"
+
+    response = client.post("/verify", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert seen == []
+    assert client.get("/verify").status_code == 200  # Only POSTs are gated
+
+
+def test_upload_passes_when_there_is_room():
+    client, seen = _client({"free": True})
+    response = client.post("/verify", files={"file": ("a.png", b"x")})
+    assert response.status_code == 200 and seen == ["a.png"]
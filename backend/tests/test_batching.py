@@ -0,0 +1,44 @@
+# File: tests/test_batching.py
+
+import asyncio
+
+from app.services.batching import MicroBatcher
+
+
+async def _handler(items):
+    return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+
+def test_an_item_error_only_fails_its_own_caller():
+    batcher = MicroBatcher("test", _handler, max_batch_size=8, window_seconds=0.01)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("bad"), batcher.submit("b"),
+                                    return_exceptions=True)
+
+    good, bad, other = asyncio.run(scenario())
+    assert (good, other) == ("A", "B")
+    assert isinstance(bad, ValueError)
+    assert batcher.counters["batches"] == 1
+
+
+def test_disabled_batcher_skips_the_window():
+    batcher = MicroBatcher("test", _handler, max_batch_size=8, window_seconds=60, enabled=lambda: False)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1)
+
+    assert asyncio.run(scenario()) == ["A", "B"]
+    assert batcher.counters["batches"] == 2
+
+
+def test_handler_failure_reaches_every_caller():
+    async def broken(items):
+        raise RuntimeError("down")
+
+    batcher = MicroBatcher("test", broken, max_batch_size=2, window_seconds=0.01)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
@@ -0,0 +1,102 @@
+# File: tests/test_blob_store.py
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import blob_store, job_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    job_store.close_store()
+    job_store.init_store(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "BLOB_GC_GRACE_SECONDS", -1)  # Everything unreferenced is collectable
+    monkeypatch.setattr(blob_store.cert_proc, "encrypt_upload_to", lambda src, dst: open(dst, "wb").write(b"enc"))
+    monkeypatch.setattr(blob_store, "_TOMBSTONE_POLL_SECONDS", 0.01)
+    backend = blob_store.InMemoryBlobBackend()
+    monkeypatch.setattr(blob_store, "_backend", backend)
+    yield backend
+    job_store.close_store()
+
+
+@pytest.fixture
+def upload(tmp_path):
+    src = tmp_path / "upload.pdf"
+    src.write_bytes(b"plain")
+    return str(src)
+
+
+def _drop_refs():
+    with job_store._lock:
+        job_store._db().execute("DELETE FROM blob_refs")
+
+
+def test_blob_referenced_after_scan_is_kept(store):
+    job_store.add_blob_ref("k", "a")
+    _drop_refs()
+    assert job_store.find_unreferenced_blobs(1e12) == ["k"]
+
+    job_store.add_blob_ref("k", "b")  # A new job reuses the blob before the GC gets to it
+    assert job_store.tombstone_blob("k") is None
+
+
+def test_tombstoned_blob_is_not_reused(store):
+    job_store.add_blob_ref("k", "a")
+    _drop_refs()
+    tombstone = job_store.tombstone_blob("k")
+    assert tombstone is not None
+    assert not job_store.add_blob_ref("k", "b")
+    job_store.forget_blob("k", tombstone)
+    assert job_store.add_blob_ref("k", "b")
+
+
+def test_abandoned_tombstone_is_cleared(store, monkeypatch):
+    job_store.add_blob_ref("k", "a")
+    _drop_refs()
+    job_store.tombstone_blob("k")
+    monkeypatch.setattr(settings, "BLOB_GC_DELETE_TIMEOUT_SECONDS", -1)
+    assert job_store.add_blob_ref("k", "b")
+
+
+def test_upload_during_delete_waits_and_rewrites(store, upload):
+    asyncio.run(blob_store.store_upload("a", "k", upload))
+    _drop_refs()
+    deleting = asyncio.Event()
+    release = asyncio.Event()
+    real_delete = store.delete
+
+    async def slow_delete(key):
+        deleting.set()
+        await release.wait()
+        await real_delete(key)
+
+    store.delete = slow_delete
+
+    async def scenario():
+        gc = asyncio.ensure_future(blob_store.collect_garbage())
+        await deleting.wait()
+        writer = asyncio.ensure_future(blob_store.store_upload("b", "k", upload))
+        await asyncio.sleep(0.05)
+        assert not writer.done()  # Waiting for the GC, not trusting the copy being deleted
+        release.set()
+        assert await gc == 1
+        await writer
+
+    asyncio.run(scenario())
+    assert "k" in store.blobs
+
+
+def test_failed_delete_restores_the_blob(store, upload):
+    asyncio.run(blob_store.store_upload("a", "k", upload))
+    _drop_refs()
+
+    async def broken_delete(key):
+        raise OSError("unreachable")
+
+    store.delete = broken_delete
+    assert asyncio.run(blob_store.collect_garbage()) == 0
+    assert job_store.add_blob_ref("k", "b")
+    assert "k" in store.blobs
@@ -0,0 +1,50 @@
+# File: tests/test_body_limit.py
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.body_limit import BodySizeLimitMiddleware
+
+LIMIT = 1024
+
+
+def _client():
+    app = FastAPI()
+    seen = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        seen.append(file.filename)
+        return {"size": len(await file.read())}
+
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": LIMIT})
+    return TestClient(app), seen
+
+
+def test_small_upload_passes():
+    client, seen = _client()
+    response = client.post("/upload", files={"file": ("a.png", b"x" * 100)})
+    assert response.status_code == 200 and seen == ["a.png"]
+
+
+def test_declared_length_over_limit_is_rejected_before_parsing():
+    client, seen = _client()
+    response = client.post("/upload", files={"file": ("a.png", b"x" * (LIMIT * 4))})
+    assert response.status_code == 413
+    assert seen == []
+
+
+def test_chunked_body_over_limit_is_rejected():
+    client, seen = _client()
+
+    def chunks():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\n"
+        for _ in range(8):
+            yield b"x" * 512
+        yield b"\r\n--b--\r\n"
+
+    response = client.post(
+        "/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert seen == []
@@ -0,0 +1,41 @@
+# File: tests/test_cpu_pool.py
+
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core.config import settings
+from app.services import cpu_pool
+
+
+def _crash_once(marker: str) -> str:
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)  # Like an OOM kill: the worker vanishes mid-task
+    return "ok"
+
+
+def _always_crash() -> None:
+    os._exit(1)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 1)
+    monkeypatch.setattr(cpu_pool, "_warm_worker", cpu_pool._noop)
+    cpu_pool.start()
+    yield
+    cpu_pool.shutdown()
+
+
+def test_dead_worker_is_replaced_and_the_task_retried(pool, tmp_path):
+    assert asyncio.run(cpu_pool.run(_crash_once, str(tmp_path / "crashed"))) == "ok"
+    assert asyncio.run(cpu_pool.run(_crash_once, str(tmp_path / "crashed"))) == "ok"
+
+
+def test_task_that_keeps_crashing_fails(pool):
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(cpu_pool.run(_always_crash))
+    assert asyncio.run(cpu_pool.run(os.getpid)) > 0  # The pool still works for other tasks
@@ -0,0 +1,61 @@
+# File: tests/test_job_store.py
+
+import pytest
+
+from app.services import job_store
+
+NOW = "2025-10-01T00:00:00"
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store.close_store()
+    job_store.init_store(str(tmp_path / "jobs.db"))
+    job_store.create_jobs([
+        {"jobId": "a", "status": "queued", "createdAt": NOW},
+        {"jobId": "b", "status": "queued", "createdAt": NOW},
+    ])
+    yield job_store
+    job_store.close_store()
+
+
+def test_a_job_is_claimed_once(store, monkeypatch):
+    assert store.claim_job("a", 60, NOW)
+    # A second process (different worker id) cannot take a live lease.
+    monkeypatch.setattr(store, "WORKER_ID", "other-process")
+    assert not store.claim_job("a", 60, NOW)
+    assert not store.renew_lease("a", 60)
+
+
+def test_expired_lease_can_be_reclaimed(store, monkeypatch):
+    assert store.claim_job("a", -1, NOW)  # Already expired
+    monkeypatch.setattr(store, "WORKER_ID", "other-process")
+    assert store.claim_job("a", 60, NOW)
+    monkeypatch.undo()
+    assert not store.renew_lease("a", 60)  # The original holder lost it
+
+
+def test_finished_jobs_are_not_claimed(store):
+    store.update_job("b", status="done")
+    assert not store.claim_job("b", 60, NOW)
+
+
+def test_requeue_only_expired_leases(store):
+    store.claim_job("a", -1, NOW)
+    store.claim_job("b", 60, NOW)
+    assert store.requeue_expired_jobs() == ["a"]
+    assert store.get_job("a")["status"] == "queued"
+    assert store.get_job("b")["status"] == "processing"
+
+
+def test_release_returns_job_to_queue(store):
+    store.claim_job("a", 60, NOW)
+    store.release_job("a")
+    assert store.get_job("a")["status"] == "queued"
+    assert store.claim_job("a", 60, NOW)
+
+
+def test_deferred_job_is_not_claimed_before_retry_at(store):
+    store.update_job("a", retryAt="2025-10-01T00:05:00")
+    assert not store.claim_job("a", 60, NOW)
+    assert store.claim_job("a", 60, "2025-10-01T00:05:00")
@@ -0,0 +1,95 @@
+# File: tests/test_rules.py
+
+import asyncio
+
+import pytest
+
+from app.services import rules, verification
+
+STUDENT = "Priya Sharma"
+CERT_TEXT = "Certificate of Completion. This is awarded to Priya Sharma for completing Machine Learning."
+
+
+def _page(url, status_code=200, matched_name=True, has_keywords=True):
+    return {"url": url, "status_code": status_code, "matched_name": matched_name, "has_keywords": has_keywords}
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Replaces the live page check; every fetched URL 'confirms' the student unless configured otherwise."""
+    calls = []
+    outcome = {"ok": True, "status_code": 200, "matched_name": True}
+
+    async def fake_verify(urls, text, student_name):
+        calls.append(list(urls))
+        page = _page(urls[0], outcome["status_code"], outcome["matched_name"])
+        if outcome["ok"]:
+            return {"ok": True, "score": 1.0, "methods": [], "evidence": page}
+        return {"ok": False, "score": 0.0, "methods": [], "evidence": {"checked_urls": urls, "pages": [page]}}
+
+    monkeypatch.setattr(verification, "verify_via_qr_or_link", fake_verify)
+    return calls, outcome
+
+
+def _evaluate(urls, text=CERT_TEXT):
+    return asyncio.run(rules.evaluate(text, urls, STUDENT))
+
+
+def test_verification_url_with_name_is_valid(fetched):
+    verdict = _evaluate(["https://www.coursera.org/verify/ABC123XYZ"])
+    assert verdict["status"] == "valid"
+    assert verdict["issuer"] == "coursera"
+
+
+@pytest.mark.parametrize("url", [
+    "https://docs.google.com/document/d/1forged/edit",
+    "https://www.linkedin.com/posts/someone_certificate-activity-123",
+    "https://www.amazon.com/gp/product/B000",
+    "https://www.coursera.org/learn/machine-learning",
+])
+def test_domain_only_urls_go_to_llm(fetched, url):
+    calls, _ = fetched
+    assert _evaluate([url]) is None
+    assert calls == []  # Not even fetched: the page could say anything
+
+
+def test_domain_only_url_404_is_not_invalid(fetched):
+    _, outcome = fetched
+    outcome.update(ok=False, status_code=404, matched_name=False)
+    assert _evaluate(["https://docs.google.com/document/d/missing"], text="Certificate of Completion") is None
+
+
+def test_verification_url_404_without_name_is_invalid(fetched):
+    _, outcome = fetched
+    outcome.update(ok=False, status_code=404, matched_name=False)
+    verdict = _evaluate(["https://www.coursera.org/verify/NOPE"], text="Certificate of Completion")
+    assert verdict["status"] == "invalid"
+    assert verdict["confidence_score"] < 0.5  # Confidence in validity, as in the LLM verdict
+
+
+def test_page_without_student_name_is_not_valid(fetched):
+    _, outcome = fetched
+    outcome.update(matched_name=False)
+    assert _evaluate(["https://www.coursera.org/verify/ABC123XYZ"]) is None
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.linkedin.com/posts/x?ref=linkedin.com/learning/certificates/abc",
+    "https://www.linkedin.com/posts/x#linkedin.com/learning/certificates/abc",
+    "https://www.credly.com/users/forger?x=credly.com/badges/abc",
+    "https://www.credly.com/users/forger#credly.com/badges/abc",
+    "https://evil.example/credly.com/badges/abc",
+    "https://notcredly.com/badges/abc",
+])
+def test_spoofed_verification_urls_go_to_llm(fetched, url):
+    calls, _ = fetched
+    assert _evaluate([url]) is None
+    assert calls == []
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.linkedin.com/learning/certificates/abc?trk=share",
+    "https://www.credly.com/badges/abc#details",
+])
+def test_verification_urls_with_query_are_recognised(fetched, url):
+    assert _evaluate([url])["status"] == "valid"
@@ -0,0 +1,50 @@
+# File: tests/test_security.py
+
+import io
+import struct
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.utils import security
+
+PLAINTEXT = b"certificate bytes " * 1000
+
+
+@pytest.fixture(autouse=True)
+def key():
+    security.initialize_aes_key(bytes(32))
+
+
+def _encrypt(data=PLAINTEXT):
+    dst = io.BytesIO()
+    security.encrypt_stream(io.BytesIO(data), dst, chunk_size=4096)
+    return dst.getvalue()
+
+
+def _decrypt(blob):
+    dst = io.BytesIO()
+    security.decrypt_stream(io.BytesIO(blob), dst)
+    return dst.getvalue()
+
+
+def test_round_trip_uses_a_fresh_key_per_blob():
+    first, second = _encrypt(), _encrypt()
+    assert first[4] == security.BLOB_VERSION == 2
+    assert first != second  # Different salts, so different keys
+    assert _decrypt(first) == _decrypt(second) == PLAINTEXT
+
+
+def test_tampered_chunk_fails():
+    blob = bytearray(_encrypt())
+    blob[-1] ^= 1
+    with pytest.raises(ValueError):
+        _decrypt(bytes(blob))
+
+
+def test_version_1_blobs_are_still_readable():
+    key_id = security.current_key_id().encode("ascii")
+    prefix = b"\x01" * security.NONCE_PREFIX_LEN
+    header = security.BLOB_MAGIC + struct.pack(">BB", 1, len(key_id)) + key_id + prefix + struct.pack(">I", 4096)
+    record = AESGCM(security.AES_KEY).encrypt(security._chunk_nonce(prefix, 0, True), b"legacy", header)
+    assert _decrypt(header + record) == b"legacy"
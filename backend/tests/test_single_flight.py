@@ -0,0 +1,69 @@
+# File: tests/test_single_flight.py
+
+import asyncio
+
+import pytest
+
+from app.utils.cache import SingleFlight
+
+
+def test_follower_survives_leader_cancellation():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "text"
+
+        leader = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, calls, flight.coalesced
+
+    result, calls, coalesced = asyncio.run(scenario())
+    assert result == "text"
+    assert calls == [1] and coalesced == 1
+
+
+def test_call_is_cancelled_when_every_caller_leaves():
+    async def scenario():
+        flight, state = SingleFlight(), {"cancelled": False}
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        callers = [asyncio.create_task(flight.do("k", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        # A fresh call for the same key is not tied to the cancelled one.
+        async def quick():
+            return "again"
+        return state["cancelled"], await flight.do("k", quick)
+
+    assert asyncio.run(scenario()) == (True, "again")
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream")
+
+        return await asyncio.gather(flight.do("k", boom), flight.do("k", boom), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
@@ -0,0 +1,35 @@
+# File: tests/test_verdict_parsing.py
+
+import json
+
+import pytest
+
+from app.services import huggingface as hf_service
+
+
+def test_compact_verdict_is_expanded():
+    verdict = hf_service._parse_verdict(json.dumps({"v": True, "c": 0.9, "r": "ok", "n": "A B", "i": "coursera"}))
+    assert verdict == {"is_valid": True, "confidence_score": 0.9, "reasoning": "ok", "matched_name": "A B", "issuer": "coursera"}
+    assert hf_service.is_well_formed_verdict(verdict)
+
+
+def test_optional_keys_get_defaults():
+    verdict = hf_service._parse_verdict('{"v": false, "c": 0.3}')
+    assert verdict["reasoning"] == "" and verdict["matched_name"] is None and verdict["issuer"] is None
+
+
+@pytest.mark.parametrize("text", [
+    '{"v": true, "r": "no confidence"}',
+    '{"v": "yes", "c": 0.8}',
+    '{"is_valid": true, "confidence_score": null}',
+    '{"is_valid": true, "confidence_score": true}',
+])
+def test_incomplete_verdicts_are_errors(text):
+    verdict = hf_service._parse_verdict(text)
+    assert verdict["error"] == "bad_response"
+    assert not hf_service.is_well_formed_verdict(verdict)
+    assert isinstance(verdict["confidence_score"], float)
+
+
+def test_confidence_is_clamped():
+    assert hf_service._parse_verdict('{"v": true, "c": 7}')["confidence_score"] == 1.0
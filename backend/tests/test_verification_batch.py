@@ -0,0 +1,44 @@
+# File: tests/test_verification_batch.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import http_client
+from app.services import huggingface as hf_service
+
+VERDICT = {"is_valid": True, "confidence_score": 0.9, "reasoning": "ok", "matched_name": "A", "issuer": None}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A mock text-generation endpoint that rejects list `inputs` with 422."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        requests.append(body)
+        if isinstance(body["inputs"], list):
+            return httpx.Response(422, json={"error": "inputs must be a string"})
+        return httpx.Response(200, json=[{"generated_text": json.dumps(VERDICT)}])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_client._clients, http_client.HUGGINGFACE, client)
+    monkeypatch.setattr(settings, "LLM_STREAMING", False)
+    return requests
+
+
+def test_batches_are_sent_per_prompt_by_default(upstream):
+    verdicts = asyncio.run(hf_service._verification_batch(["a", "b"]))
+    assert all(v["is_valid"] for v in verdicts)
+    assert all(isinstance(body["inputs"], str) for body in upstream)
+
+
+def test_rejected_list_batch_is_retried_per_prompt(upstream, monkeypatch):
+    monkeypatch.setattr(settings, "HF_LLM_BATCH_INPUTS", True)
+    verdicts = asyncio.run(hf_service._verification_batch(["a", "b", "c"]))
+    assert [v["is_valid"] for v in verdicts] == [True, True, True]
+    assert isinstance(upstream[0]["inputs"], list) and len(upstream) == 4
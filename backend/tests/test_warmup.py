@@ -0,0 +1,37 @@
+# File: tests/test_warmup.py
+
+import asyncio
+
+from app.core.config import settings
+from app.services import warmup
+from app.services.resilience import CircuitBreaker
+
+
+def _warmer(results):
+    async def ping():
+        return results.pop(0)
+
+    return warmup.ModelWarmer("test", CircuitBreaker("test", failure_threshold=3, reset_seconds=30), ping)
+
+
+def test_failed_keep_warm_ping_does_not_undo_warm_up(monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(settings, "KEEP_WARM_INTERVAL_SECONDS", 0.01)
+    warmer = _warmer([True, False, False, False])
+
+    async def scenario():
+        assert await warmer.warm_up()
+        keep_warm = asyncio.ensure_future(warmer.keep_warm())
+        await asyncio.sleep(0.05)
+        keep_warm.cancel()
+
+    asyncio.run(scenario())
+    assert not warmer.ready  # Reported cold...
+    assert warmer.warmed_up  # ...but the initial warm-up still counts for readiness
+
+
+def test_ocr_warmer_is_skipped_for_local_ocr(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_POLICY", "local")
+    assert [warmer.name for warmer in warmup._active()] == ["ai-verification"]
+    monkeypatch.setattr(settings, "OCR_POLICY", "local_first")
+    assert [warmer.name for warmer in warmup._active()] == ["ocr", "ai-verification"]
@@ -0,0 +1,22 @@
+# File: tests/test_warmup_ping.py
+
+import asyncio
+
+import httpx
+
+from app.services import http_client
+from app.services import huggingface as hf_service
+from app.services.resilience import CircuitBreaker
+
+
+def test_ping_latency_is_not_sampled(monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[])))
+    monkeypatch.setitem(http_client._clients, http_client.HUGGINGFACE, client)
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+
+    assert asyncio.run(hf_service._ping(breaker, "https://hf.test/model", json={"inputs": "OK"}))
+    assert breaker.counters["successes"] == 1
+    assert breaker.percentile(50) is None and not breaker._latencies
+
+    asyncio.run(hf_service._hf_post(breaker, "https://hf.test/model", json={"inputs": "real"}))
+    assert len(breaker._latencies) == 1